@@ -0,0 +1,320 @@
+"""Drive concurrent sessions against a running Streamlit server and report latency percentiles per interaction
+
+Usage:
+    python benchmarks/load_test.py                                # 16 sessions, 4 at a time
+    python benchmarks/load_test.py --sessions 64 --concurrency 16
+    python benchmarks/load_test.py --url http://localhost:8501    # an already running server
+    python benchmarks/load_test.py --json results.json
+
+Unless --url is given, the script starts `streamlit run main.py` on a free
+port with an empty disk cache, so runs are comparable, and stops it
+afterwards. Every session opens its own websocket to the
+server and speaks the browser's protocol: open the landing page, type a
+partial name, click the matching suggestion, drag the start-year slider,
+then use the controls on the map and analysis tabs, which rerun only their
+fragment. The sessions share the server's process, caches and prefetcher
+like real users do, and each interaction is timed from sending the rerun to
+its script_finished message. Sessions stay connected until the end so the
+server's memory growth per session can be measured. The rendered stat boxes
+are checked against the series for the session's location to catch
+cross-session interference.
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from collections import defaultdict
+from pathlib import Path
+
+import numpy as np
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from tornado.websocket import websocket_connect
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from utils import get_forest_series  # noqa: E402
+
+LOCATIONS = ['Amazon Rainforest', 'Jim Corbett National Park', 'Noida', 'Western Ghats', 'Congo Rainforest',
+             'Kaziranga National Park', 'Sundarbans', 'Daintree Rainforest']
+SLIDER_YEARS = (2005, 2010, 2015)
+INTERACTIONS = ('landing', 'search', 'suggestion_click', 'slider', 'map_tab', 'analysis_tab')
+COVER_PATTERN = re.compile(r'Current Forest Cover</h3>\s*<h2>([\d.]+)%</h2>')
+RERUN_TIMEOUT = 300  # Seconds before a rerun counts as failed
+STARTUP_TIMEOUT = 120  # Seconds to wait for a started server to report healthy
+
+
+class FlowError(Exception):
+    """A rerun failed or a control the flow needs was not rendered"""
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def rss_bytes(pid: int) -> int:
+    """Resident memory of process pid"""
+    with open(f'/proc/{pid}/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+
+def start_server(port: int, log, cache_dir: str) -> subprocess.Popen:
+    """Start main.py under `streamlit run` with an empty disk cache and wait until it answers its health check"""
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'streamlit', 'run', str(ROOT / 'main.py'),
+         '--server.headless', 'true', '--server.port', str(port), '--server.address', '127.0.0.1',
+         '--browser.gatherUsageStats', 'false'],
+        cwd=str(ROOT), stdout=log, stderr=subprocess.STDOUT,
+        env={**os.environ, 'FOREST_TRACKER_CACHE_DIR': cache_dir}
+    )
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"Server exited with status {server.returncode}")
+        try:
+            with urllib.request.urlopen(f'http://127.0.0.1:{port}/_stcore/health', timeout=1) as response:
+                if response.status == 200:
+                    return server
+        except OSError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError(f"Server did not become healthy within {STARTUP_TIMEOUT}s")
+
+
+class Session:
+    """One browser tab: a websocket to the server, the elements it shows and its widget values"""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.elements = {}  # Delta path -> (fragment id, element)
+        self.widgets = {}  # Widget id -> (value field, value), sent with every rerun like the browser does
+        self._socket = None
+
+    async def connect(self):
+        self._socket = await websocket_connect(self.url.replace('http', 'ws', 1) + '/_stcore/stream',
+                                               max_message_size=1 << 30)
+
+    def close(self):
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+
+    async def rerun(self, fragment_id: str = '', trigger: str = '') -> float:
+        """Ask for a rerun, apply its deltas and return the seconds until it finished"""
+        message = BackMsg()
+        state = message.rerun_script
+        state.SetInParent()  # A first run has no widget values, the message still has to ask for a rerun
+        for widget_id, (field, value) in self.widgets.items():
+            widget = state.widget_states.widgets.add()
+            widget.id = widget_id
+            if field == 'double_array_value':
+                widget.double_array_value.data[:] = value
+            else:
+                setattr(widget, field, value)
+        if trigger:
+            widget = state.widget_states.widgets.add()
+            widget.id = trigger
+            widget.trigger_value = True
+        if fragment_id:
+            state.fragment_id = fragment_id
+
+        start = time.perf_counter()
+        await self._socket.write_message(message.SerializeToString(), binary=True)
+        while True:
+            raw = await asyncio.wait_for(self._socket.read_message(), RERUN_TIMEOUT)
+            if raw is None:
+                raise FlowError("Server closed the connection")
+            msg = ForwardMsg()
+            msg.ParseFromString(raw)
+            kind = msg.WhichOneof('type')
+            if kind == 'new_session' and not msg.new_session.fragment_ids_this_run:
+                # A full run redraws the page, st.rerun() inside the script starts another
+                self.elements.clear()
+            elif kind == 'delta' and msg.delta.WhichOneof('type') == 'new_element':
+                element = msg.delta.new_element
+                if element.WhichOneof('type') == 'exception':
+                    raise FlowError(element.exception.message)
+                self.elements[tuple(msg.metadata.delta_path)] = (msg.delta.fragment_id, element)
+            elif kind == 'script_finished':
+                if msg.script_finished == ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                    continue
+                if msg.script_finished == ForwardMsg.FINISHED_WITH_COMPILE_ERROR:
+                    raise FlowError("Script failed to compile")
+                break
+        elapsed = time.perf_counter() - start
+
+        if not fragment_id:
+            shown = {getattr(element, element.WhichOneof('type')).id for _, element in self.elements.values()
+                     if element.WhichOneof('type') in ('text_input', 'slider', 'radio', 'checkbox', 'button')}
+            self.widgets = {widget_id: value for widget_id, value in self.widgets.items() if widget_id in shown}
+        return elapsed
+
+    def find(self, kind: str, match) -> tuple:
+        """(fragment id, proto) of the first shown kind element whose label satisfies match"""
+        for fragment_id, element in self.elements.values():
+            if element.WhichOneof('type') == kind and match(getattr(element, kind).label):
+                return fragment_id, getattr(element, kind)
+        raise FlowError(f"No {kind} matching the flow")
+
+    def set(self, widget, field: str, value):
+        self.widgets[widget.id] = (field, value)
+
+    def markdown(self) -> list:
+        return [element.markdown.body for _, element in self.elements.values()
+                if element.WhichOneof('type') == 'markdown']
+
+
+class Recorder:
+    """Interaction latencies and failures of every session"""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = []
+        self.mismatches = []
+
+    async def timed(self, interaction: str, session: Session, fragment_id: str = '', trigger: str = ''):
+        self.latencies[interaction].append(await session.rerun(fragment_id, trigger))
+
+
+async def user_flow(index: int, location: str, session: Session, recorder: Recorder):
+    await session.connect()
+    await recorder.timed('landing', session)
+
+    _, search = session.find('text_input', lambda label: True)
+    session.set(search, 'string_value', location[:5].lower())
+    await recorder.timed('search', session)
+
+    try:
+        _, suggestion = session.find('button', lambda label: label.endswith(location.title()))
+        await recorder.timed('suggestion_click', session, trigger=suggestion.id)
+    except FlowError:
+        # No suggestion list, the query matched exactly, so type the whole name
+        session.set(search, 'string_value', location)
+        await recorder.timed('suggestion_click', session)
+
+    for year in SLIDER_YEARS:
+        _, slider = session.find('slider', lambda label: label == 'Select Start Year')
+        session.set(slider, 'double_array_value', [year])
+        await recorder.timed('slider', session)
+
+    # Tabs switch in the browser, the reruns come from the controls inside them
+    fragment_id, radio = session.find('radio', lambda label: label == 'Map Rendering')
+    session.set(radio, 'int_value', list(radio.options).index('Density Overlay'))
+    await recorder.timed('map_tab', session, fragment_id)
+    fragment_id, checkbox = session.find('checkbox', lambda label: label == 'Show Deforestation Rates')
+    session.set(checkbox, 'bool_value', False)
+    await recorder.timed('analysis_tab', session, fragment_id)
+
+    expected = f'{get_forest_series(location).forest_cover_at():.1f}'
+    shown = [match.group(1) for body in session.markdown() for match in [COVER_PATTERN.search(body)] if match]
+    if shown != [expected]:
+        recorder.mismatches.append((index, location, expected, shown))
+
+
+async def run_sessions(url: str, sessions: int, concurrency: int, recorder: Recorder, idle: list):
+    """Run the user flows, at most concurrency at a time, leaving finished sessions connected in idle"""
+    slots = asyncio.Semaphore(concurrency)
+
+    async def run(index: int):
+        session = Session(url)
+        idle.append(session)
+        async with slots:
+            try:
+                await user_flow(index, LOCATIONS[index % len(LOCATIONS)], session, recorder)
+            except (FlowError, OSError, asyncio.TimeoutError) as e:
+                # A failed rerun leaves widgets missing, the flow cannot go on
+                recorder.errors.append((index, 'flow', repr(e)))
+
+    await asyncio.gather(*(run(index) for index in range(sessions)))
+
+
+def percentiles(values) -> dict:
+    p50, p95, p99 = np.percentile(np.asarray(values) * 1000, [50, 95, 99])
+    return {'count': len(values), 'p50_ms': p50, 'p95_ms': p95, 'p99_ms': p99}
+
+
+async def measure(args, server_pid) -> dict:
+    # One session first so imports and the shared caches are warm, as on a server that has been up a while
+    warmup = Session(args.url)
+    await user_flow(-1, LOCATIONS[0], warmup, Recorder())
+    warmup.close()
+
+    recorder = Recorder()
+    idle = []
+    rss_before = rss_bytes(server_pid) if server_pid else None
+    started = time.perf_counter()
+    await run_sessions(args.url, args.sessions, args.concurrency, recorder, idle)
+    wall = time.perf_counter() - started
+    rss_after = rss_bytes(server_pid) if server_pid else None
+    for session in idle:
+        session.close()
+
+    reruns = sum(len(values) for values in recorder.latencies.values())
+    return {
+        'sessions': args.sessions,
+        'concurrency': args.concurrency,
+        'wall_seconds': wall,
+        'reruns_per_second': reruns / wall,
+        'server_memory_per_session_bytes': (rss_after - rss_before) / args.sessions if server_pid else None,
+        'errors': recorder.errors,
+        'mismatches': recorder.mismatches,
+        'interactions': {name: percentiles(recorder.latencies[name]) for name in INTERACTIONS
+                         if recorder.latencies[name]},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sessions', type=int, default=16, help='simulated users')
+    parser.add_argument('--concurrency', type=int, default=4, help='sessions running at the same time')
+    parser.add_argument('--url', help='server to load, by default one is started for the run')
+    parser.add_argument('--json', type=Path, help='also write the report to this file')
+    args = parser.parse_args()
+
+    server = None
+    with tempfile.TemporaryFile() as log, tempfile.TemporaryDirectory() as cache_dir:
+        if args.url is None:
+            port = free_port()
+            server = start_server(port, log, cache_dir)
+            args.url = f'http://127.0.0.1:{port}'
+        try:
+            report = asyncio.run(measure(args, server.pid if server else None))
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait(timeout=30)
+        if server is not None and server.returncode not in (0, -15):
+            log.seek(0)
+            print(log.read().decode(errors='replace')[-4000:], file=sys.stderr)
+
+    reruns = sum(stats['count'] for stats in report['interactions'].values())
+    print(f"{'interaction':<20}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, stats in report['interactions'].items():
+        print(f"{name:<20}{stats['count']:>7}{stats['p50_ms']:>10.1f}{stats['p95_ms']:>10.1f}{stats['p99_ms']:>10.1f}")
+    memory = report['server_memory_per_session_bytes']
+    print(f"\n{args.sessions} sessions, {args.concurrency} concurrent: {reruns} reruns in "
+          f"{report['wall_seconds']:.1f}s ({report['reruns_per_second']:.1f} reruns/s)"
+          + (f", {memory / 1e6:.1f} MB server memory per session" if memory is not None else ''))
+    for session, interaction, message in report['errors'][:10]:
+        print(f"ERROR session {session} {interaction}: {message}")
+    for session, location, expected, shown in report['mismatches'][:10]:
+        print(f"MISMATCH session {session} {location}: expected {expected}%, rendered {shown}")
+
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2) + '\n')
+    if report['errors'] or report['mismatches']:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
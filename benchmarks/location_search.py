@@ -0,0 +1,85 @@
+"""Measure LocationIndex build, write and open times and per-query latency on a synthetic gazetteer
+
+Usage: python benchmarks/location_search.py [--size N] [--queries N]
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pyarrow as pa
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from utils.gazetteer import StringView  # noqa: E402
+from utils.search import LocationIndex, write_location_index  # noqa: E402
+from utils.seeding import normalize_location  # noqa: E402
+
+SYLLABLES = ['ka', 'ran', 'go', 'mal', 'sun', 'dar', 'ban', 'ti', 'mo', 'ra', 'west', 'ern', 'gha', 'lo', 'na', 'pur']
+KINDS = ['national park', 'forest', 'rainforest', 'wildlife sanctuary', 'city', 'reserve', 'hills', 'valley']
+
+
+def synthetic_names(size: int, seed: int = 0) -> list:
+    """Return size distinct place names built from random syllables"""
+    rng = np.random.default_rng(seed)
+    syllables = rng.integers(0, len(SYLLABLES), size=(size, 4))
+    lengths = rng.integers(2, 5, size=size)
+    kinds = rng.integers(0, len(KINDS), size=size)
+    return [
+        f"{''.join(SYLLABLES[s] for s in row[:length])} {KINDS[kind]} {i}"
+        for i, (row, length, kind) in enumerate(zip(syllables.tolist(), lengths.tolist(), kinds.tolist()))
+    ]
+
+
+def typo(name: str, rng) -> str:
+    """Drop one character to simulate a typing mistake"""
+    position = int(rng.integers(1, len(name) - 1))
+    return name[:position] + name[position + 1:]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', type=int, default=1_000_000, help='gazetteer entries')
+    parser.add_argument('--queries', type=int, default=500, help='queries per workload')
+    args = parser.parse_args()
+
+    names = synthetic_names(args.size)
+    keys = [normalize_location(name) for name in names]
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / 'gazetteer.search.arrow'
+        start = time.perf_counter()
+        write_location_index(keys, path)
+        print(f"built and wrote index over {len(names):,} names in {time.perf_counter() - start:.1f}s")
+
+        # The app maps the file over the gazetteer's string columns, as here
+        name_column, key_column = StringView(pa.array(names)), StringView(pa.array(keys))
+        start = time.perf_counter()
+        index = LocationIndex.open(path, name_column, key_column)
+        print(f"opened index in {(time.perf_counter() - start) * 1000:.1f} ms")
+        run_queries(index, names, args.queries)
+
+
+def run_queries(index: LocationIndex, names: list, queries: int):
+
+    rng = np.random.default_rng(1)
+    picks = [names[i] for i in rng.integers(0, len(names), size=queries)]
+    workloads = {
+        'prefix': [name[:int(rng.integers(2, 8))] for name in picks],
+        'word': [name.split()[1] for name in picks],
+        'exact': picks,
+        'typo': [typo(name.split()[0], rng) for name in picks],
+    }
+    for label, queries in workloads.items():
+        timings = []
+        for query in queries:
+            start = time.perf_counter()
+            index.search(query, limit=10)
+            timings.append(time.perf_counter() - start)
+        timings = np.array(timings) * 1000
+        print(f"{label:<8} p50 {np.percentile(timings, 50):6.2f} ms   p95 {np.percentile(timings, 95):6.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""Compare the map rendering modes by build time, HTML size and browser render time
+
+Usage: python benchmarks/map_render.py [--repeat N]
+
+Browser render times need playwright (pip install playwright && playwright install chromium);
+without it only the server-side numbers are reported.
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+# Every build must be real work, not a cache hit
+os.environ['FOREST_TRACKER_DISK_CACHE'] = '0'
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from utils.cache import clear_caches  # noqa: E402
+from utils.data_generator import get_location_coordinates  # noqa: E402
+from utils.visualization import RENDER_MODES, create_map  # noqa: E402
+
+LOCATIONS = ["Amazon Rainforest", "Jim Corbett National Park", "Noida"]
+FOREST_COVER = 80.0
+
+
+def render_in_browser(html_pages):
+    """Return the time in seconds each page takes to load and paint in headless Chromium"""
+    try:
+        from playwright.sync_api import sync_playwright
+    except ImportError:
+        return [None] * len(html_pages)
+
+    timings = []
+    with sync_playwright() as p:
+        browser = p.chromium.launch()
+        page = browser.new_page()
+        for html in html_pages:
+            start = time.perf_counter()
+            page.set_content(html, wait_until='load')
+            page.evaluate('() => new Promise(r => requestAnimationFrame(() => requestAnimationFrame(r)))')
+            timings.append(time.perf_counter() - start)
+        browser.close()
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=3, help='builds per location and mode')
+    args = parser.parse_args()
+
+    print(f"{'location':<28}{'mode':<10}{'build (s)':>12}{'html (KB)':>12}{'browser (s)':>14}")
+    for location in LOCATIONS:
+        coordinates = get_location_coordinates(location)
+        for mode in RENDER_MODES:
+            best = float('inf')
+            for _ in range(args.repeat):
+                clear_caches()
+                start = time.perf_counter()
+                html = create_map(location, coordinates, FOREST_COVER, seed=0, render_mode=mode)
+                best = min(best, time.perf_counter() - start)
+            browser = render_in_browser([html])[0]
+            browser_text = f"{browser:.3f}" if browser is not None else "n/a"
+            print(f"{location:<28}{mode:<10}{best:>12.3f}{len(html) / 1024:>12.1f}{browser_text:>14}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,223 @@
+"""Time cold imports, the generator, map builder, charts and a full page render against stored baselines
+
+Usage:
+    python benchmarks/run_benchmarks.py                     # compare with baselines.json
+    python benchmarks/run_benchmarks.py --update-baseline   # record new baselines
+    python benchmarks/run_benchmarks.py --filter map/       # run a subset
+
+Exits with status 1 when a metric regresses by more than --threshold. Baselines are
+machine specific, so record them on the machine that runs the comparison.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+BASELINE_PATH = Path(__file__).resolve().parent / 'baselines.json'
+
+# Every case must measure real work, not a cache hit
+os.environ['FOREST_TRACKER_DISK_CACHE'] = '0'
+sys.path.insert(0, str(ROOT))
+
+from utils import (  # noqa: E402
+    create_deforestation_rate_chart,
+    create_map,
+    create_trend_chart,
+    generate_deforestation_data,
+    generate_deforestation_data_many,
+    get_location_coordinates
+)
+from utils.cache import clear_caches  # noqa: E402
+from utils.change_detection import ChangeDetector  # noqa: E402
+from utils.data_generator import simulate_deforestation  # noqa: E402
+from utils.forecast import forecast_forest_cover  # noqa: E402
+from utils.prefetch import warm_location  # noqa: E402
+from utils.raster import get_forest_raster  # noqa: E402
+
+LOCATIONS = {
+    'rainforest': 'Amazon Rainforest',
+    'national_park': 'Jim Corbett National Park',
+    'city': 'Noida',
+    'unknown': 'Atlantis Valley',
+}
+# Large marker maps take tens of seconds, so big grids are only benchmarked as rasters
+MAP_CASES = [('markers', 'small', 20), ('raster', 'small', 20), ('raster', 'large', 100)]
+BATCH_SIZES = {'100': 100, '10k': 10000}
+COMPARE_SIZES = (10, 200)
+MIN_DELTA_SECONDS = 0.005  # Ignore regressions below timer noise
+# Each runs in a fresh interpreter, so the timings include module imports and Python startup
+COLD_START_CASES = {
+    'python': 'pass',
+    'utils': 'import utils',
+    'visualization': 'import utils.visualization',
+    'landing_page': 'from streamlit.testing.v1 import AppTest; AppTest.from_file("main.py", default_timeout=120).run()',
+}
+
+
+def payload_size(result) -> int:
+    """Bytes sent to the browser for a map HTML string or a Plotly figure"""
+    if isinstance(result, str):
+        return len(result.encode('utf-8'))
+    if hasattr(result, 'to_plotly_json'):
+        return len(result.to_json().encode('utf-8'))
+    return 0
+
+
+def run_page(location: str):
+    """Run main.py once for a location through Streamlit's AppTest"""
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(str(ROOT / 'main.py'), default_timeout=120)
+    app.session_state['location'] = location
+    app.run()
+    if app.exception:
+        raise RuntimeError(app.exception[0].message)
+    return None
+
+
+def landing_app():
+    """Return an AppTest that has rendered the landing page"""
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(str(ROOT / 'main.py'), default_timeout=120)
+    app.run()
+    return app
+
+
+def run_typing(apps: list, query: str):
+    """Type query and one more character into a landing page, the reruns that overlap the prefetch"""
+    app = apps.pop()
+    for text in (query, query + 'n'):
+        app.sidebar.text_input[0].set_value(text)
+        app.run()
+        if app.exception:
+            raise RuntimeError(app.exception[0].message)
+
+
+def run_cold(code: str):
+    """Run a snippet in a new interpreter from the repository root"""
+    subprocess.run([sys.executable, '-c', code], cwd=ROOT, check=True, stdout=subprocess.DEVNULL,
+                   stderr=subprocess.DEVNULL)
+
+
+def collect_cases():
+    """Yield (name, setup, run) for every benchmark in the matrix"""
+    for label, code in COLD_START_CASES.items():
+        yield f'cold_start/{label}', None, lambda c=code: run_cold(c)
+
+    for kind, location in LOCATIONS.items():
+        data = generate_deforestation_data(location)
+        coordinates = get_location_coordinates(location)
+        cover = float(data['forest_cover_percentage'].iloc[-1])
+
+        yield f'generate/{kind}', clear_caches, lambda loc=location: generate_deforestation_data(loc)
+        for mode, size, num_points in MAP_CASES:
+            yield (f'map/{mode}/{size}/{kind}', clear_caches,
+                   lambda loc=location, c=coordinates, fc=cover, n=num_points, m=mode:
+                   create_map(loc, c, fc, num_points=n, render_mode=m))
+        yield f'forecast/{kind}', clear_caches, lambda loc=location: forecast_forest_cover(loc)
+        yield f'raster/{kind}', clear_caches, lambda loc=location: get_forest_raster(loc)
+        yield f'zonal_stats/{kind}', None, lambda r=get_forest_raster(location): r.circle_stats(level=0)
+        yield f'trend_chart/{kind}', None, lambda d=data, loc=location: create_trend_chart(d, f'Forest Cover Trends in {loc}')
+        yield f'rate_chart/{kind}', None, lambda d=data: create_deforestation_rate_chart(d)
+        yield f'page/{kind}', clear_caches, lambda loc=location: run_page(loc)
+        # Typing that shows suggestions, must not slow down while they are prefetched
+        apps = []
+        yield (f'suggestion_rerun/{kind}', lambda a=apps: (clear_caches(), a.append(landing_app())),
+               lambda a=apps, q=location[:5].lower(): run_typing(a, q))
+        # A suggestion click once its background prefetch has finished
+        yield (f'page_prefetched/{kind}', lambda loc=location: (clear_caches(), warm_location(loc)),
+               lambda loc=location: run_page(loc))
+
+    for label, size in BATCH_SIZES.items():
+        kinds = list(LOCATIONS.values())
+        names = [f'{kinds[i % len(kinds)]} {i}' for i in range(size)]
+        yield f'generate_many/{label}', None, lambda n=names: generate_deforestation_data_many(n)
+
+        # Scoring every location from scratch against appending one year to existing scores
+        batch = simulate_deforestation(names)
+        yield f'change_detection/build/{label}', None, lambda b=batch: ChangeDetector.from_batch(b).hotspots()
+        detector = ChangeDetector(batch.locations, batch.years[:-1], batch.forest_cover[:, :-1],
+                                  batch.deforestation_rate[:, :-1])
+        yield (f'change_detection/append/{label}', None,
+               lambda d=detector, b=batch: (d.append_year(b.forest_cover[:, -1], b.deforestation_rate[:, -1]),
+                                            d.hotspots()))
+
+    for size in COMPARE_SIZES:
+        kinds = list(LOCATIONS.values())
+        data = generate_deforestation_data_many([f'{kinds[i % len(kinds)]} {i}' for i in range(size)])
+        yield f'compare_trend_chart/{size}', None, lambda d=data: create_trend_chart(d, 'Comparison')
+        yield f'compare_rate_chart/{size}', None, lambda d=data: create_deforestation_rate_chart(d)
+
+
+def measure(setup, run, repeat: int) -> dict:
+    """Return the best wall time and the payload size of the last run"""
+    timings = []
+    result = None
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        result = run()
+        timings.append(time.perf_counter() - start)
+    metrics = {'seconds': min(timings)}  # The fastest run is the least disturbed by noise
+    size = payload_size(result)
+    if size:
+        metrics['bytes'] = size
+    return metrics
+
+
+def compare(results: dict, baselines: dict, threshold: float) -> list:
+    """Return (case, metric, baseline, current) for every regression beyond the threshold"""
+    regressions = []
+    for case, metrics in results.items():
+        for metric, current in metrics.items():
+            baseline = baselines.get(case, {}).get(metric)
+            if baseline is None:
+                continue
+            if current > baseline * (1 + threshold):
+                if metric == 'seconds' and current - baseline < MIN_DELTA_SECONDS:
+                    continue
+                regressions.append((case, metric, baseline, current))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=3, help='runs per case, the fastest is kept')
+    parser.add_argument('--threshold', type=float, default=0.25, help='allowed relative slowdown')
+    parser.add_argument('--filter', default='', help='only run cases whose name contains this text')
+    parser.add_argument('--baseline', type=Path, default=BASELINE_PATH)
+    parser.add_argument('--update-baseline', action='store_true', help='store the results as the new baseline')
+    args = parser.parse_args()
+
+    os.chdir(ROOT)  # main.py loads its stylesheet relative to the repository root
+    results = {}
+    for name, setup, run in collect_cases():
+        if args.filter not in name:
+            continue
+        results[name] = measure(setup, run, args.repeat)
+        size = f"{results[name]['bytes'] / 1024:10.1f} KB" if 'bytes' in results[name] else ''
+        print(f"{name:<40}{results[name]['seconds'] * 1000:10.2f} ms{size}")
+
+    baselines = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+    if args.update_baseline:
+        baselines.update(results)
+        args.baseline.write_text(json.dumps(baselines, indent=2, sort_keys=True) + '\n')
+        print(f"Stored {len(results)} baselines in {args.baseline}")
+        return
+
+    regressions = compare(results, baselines, args.threshold)
+    for case, metric, baseline, current in regressions:
+        print(f"REGRESSION {case} {metric}: {baseline:.4g} -> {current:.4g}")
+    if regressions:
+        sys.exit(1)
+    print(f"No regressions beyond {args.threshold:.0%} in {len(results)} cases")
+
+
+if __name__ == '__main__':
+    main()
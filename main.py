@@ -1,14 +1,37 @@
+import functools
+
 import streamlit as st
 import pandas as pd
 from utils import (
-    generate_deforestation_data,
+    get_forest_series,
     get_location_coordinates,
-    create_trend_chart,
-    create_map,
-    create_deforestation_rate_chart,
     get_location_suggestions
 )
+from utils.assets import read_asset
+from utils.prefetch import PREFETCH_TOP_K, get_prefetcher
+from utils.profiling import DEBUG_ENABLED, RerunTimer, render_performance_panel
+from utils.tiles import tiles_available
 import streamlit.components.v1 as components
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+MAP_RENDER_MODES = {
+    "Forest Clusters": 'markers',
+    "Density Overlay": 'raster'
+}
+# Tile URLs point at this machine unless FOREST_TILE_URL or a public FOREST_TILE_HOST is set
+TILES_AVAILABLE = tiles_available()
+if TILES_AVAILABLE:
+    MAP_RENDER_MODES["Density Tiles"] = 'tiles'
+EXPORT_LABELS = {
+    "CSV": 'csv',
+    "Parquet": 'parquet',
+    "Arrow IPC": 'arrow'
+}
+ROLLUP_GROUPINGS = {
+    "Country → Region": 'region',
+    "Site Type → Country": 'type'
+}
+TABLE_PAGE_SIZE = 1000  # Rows sent to the browser per table page
 
 # Page configuration
 st.set_page_config(
@@ -18,9 +41,372 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Load custom CSS
-with open('styles/custom.css') as f:
-    st.markdown(f'<style>{f.read()}</style>', unsafe_allow_html=True)
+# Per-stage timings, shown with ?debug=1 or FOREST_TRACKER_DEBUG=1
+timer = RerunTimer(enabled=DEBUG_ENABLED or st.query_params.get('debug') == '1')
+st.session_state['_run_timer'] = timer
+
+
+def run_timer() -> RerunTimer:
+    """Timer of the run in progress
+
+    A fragment-only rerun executes with the globals of the last full run, whose
+    timer has already finished, so fragments look the timer up per run.
+    """
+    return st.session_state.get('_run_timer', timer)
+
+
+def timed_fragment(func):
+    """st.fragment whose fragment-only reruns are timed by a RerunTimer of their own"""
+    @functools.wraps(func)
+    def run(*args, **kwargs):
+        ctx = get_script_run_ctx()
+        if ctx is None or not ctx.fragment_ids_this_run:
+            # Part of a full run, timed with the rest of the page
+            return func(*args, **kwargs)
+        previous = run_timer()
+        fragment_timer = RerunTimer(
+            enabled=DEBUG_ENABLED or st.query_params.get('debug') == '1',
+            **{**previous.context, 'fragment': func.__name__}
+        )
+        st.session_state['_run_timer'] = fragment_timer
+        func(*args, **kwargs)
+        fragment_timer.finish()
+        if fragment_timer.enabled:
+            # The sidebar panel belongs to the full run and cannot be written from a fragment
+            render_performance_panel(fragment_timer, st.expander(f"⏱️ Performance ({func.__name__})"))
+    return st.fragment(run)
+
+
+def prefetch_suggestions(query: str, suggestions: list):
+    """Queue the top suggestions to be warmed while the user reads them, once per query"""
+    batch = st.session_state.get('_prefetch')
+    if batch is not None and batch.query == query:
+        return
+    if batch is not None:
+        batch.cancel()
+        del st.session_state['_prefetch']
+    st.session_state['_prefetch_pending'] = (query, suggestions[:PREFETCH_TOP_K])
+
+
+def start_prefetch():
+    """Start the prefetch this run queued, once its output is rendered so the two do not compete"""
+    pending = st.session_state.pop('_prefetch_pending', None)
+    if pending is not None:
+        st.session_state['_prefetch'] = get_prefetcher().submit(*pending)
+
+
+def settle_prefetch(location: str):
+    """Keep only the prefetch of the chosen location and let it finish before rendering"""
+    pending = st.session_state.get('_prefetch_pending')
+    if pending is not None and pending[0] != location:
+        del st.session_state['_prefetch_pending']
+    batch = st.session_state.get('_prefetch')
+    if batch is None or batch.query == location:
+        return
+    del st.session_state['_prefetch']
+    batch.settle(location)
+
+
+@timed_fragment
+def overview_fragment(location: str, start_year: int):
+    """Stat boxes and trend chart, depends on (location, start_year)"""
+    from utils import location_trend_chart
+    from utils.density import DEFAULT_RADIUS
+    from utils.forecast import DEFAULT_HORIZON
+    from utils.raster import DENSE_COVER, get_forest_raster
+
+    series = get_forest_series(location)
+
+    st.markdown("""
+        <div class="overview-header">
+            <h2>Forest Health Overview</h2>
+        </div>
+    """, unsafe_allow_html=True)
+
+    col1, col2, col3 = st.columns(3)
+
+    with col1:
+        st.markdown(
+            f"""
+            <div class="stat-box">
+                <h3>Current Forest Cover</h3>
+                <h2>{series.forest_cover_at():.1f}%</h2>
+                <p>of total area</p>
+            </div>
+            """,
+            unsafe_allow_html=True
+        )
+
+    with col2:
+        st.markdown(
+            f"""
+            <div class="stat-box">
+                <h3>Total Area</h3>
+                <h2>{series.total_area:,} ha</h2>
+                <p>monitored region</p>
+            </div>
+            """,
+            unsafe_allow_html=True
+        )
+
+    with col3:
+        total_loss = series.total_loss(start_year)
+        st.markdown(
+            f"""
+            <div class="stat-box warning">
+                <h3>Total Loss Since {start_year}</h3>
+                <h2>{total_loss:.1f}%</h2>
+                <p>forest cover reduction</p>
+            </div>
+            """,
+            unsafe_allow_html=True
+        )
+
+    # Zonal statistics of the same raster the density map draws
+    with run_timer().stage('zonal_stats'):
+        zone = get_forest_raster(location).circle_stats(DEFAULT_RADIUS)
+    radius_km = DEFAULT_RADIUS / 1000
+
+    col1, col2, col3 = st.columns(3)
+
+    with col1:
+        st.markdown(
+            f"""
+            <div class="stat-box">
+                <h3>Local Forest Density</h3>
+                <h2>{zone.mean_cover:.1f}%</h2>
+                <p>mean cover within {radius_km:.0f} km</p>
+            </div>
+            """,
+            unsafe_allow_html=True
+        )
+
+    with col2:
+        st.markdown(
+            f"""
+            <div class="stat-box">
+                <h3>Dense Forest Share</h3>
+                <h2>{zone.dense_fraction:.0%}</h2>
+                <p>of land within {radius_km:.0f} km above {DENSE_COVER}% cover</p>
+            </div>
+            """,
+            unsafe_allow_html=True
+        )
+
+    with col3:
+        st.markdown(
+            f"""
+            <div class="stat-box">
+                <h3>Dense Forest Area</h3>
+                <h2>{zone.dense_area_ha:,.0f} ha</h2>
+                <p>of {zone.area_ha:,.0f} ha of land</p>
+            </div>
+            """,
+            unsafe_allow_html=True
+        )
+
+    if st.checkbox("Show Trend Analysis", value=True):
+        show_forecast = st.checkbox(f"Show {DEFAULT_HORIZON}-Year Forecast", value=True)
+        st.markdown('<div class="chart-container">', unsafe_allow_html=True)
+        with run_timer().stage('trend_chart') as stage:
+            trend_chart = location_trend_chart(location, start_year, show_forecast)
+            st.plotly_chart(trend_chart, use_container_width=True)
+            stage.set_payload(trend_chart)
+        st.markdown('</div>', unsafe_allow_html=True)
+
+
+@timed_fragment
+def map_fragment(location: str, coordinates: tuple, current_cover: float):
+    """Forest map, depends on (location, coordinates, current_cover, render mode) but not the start year"""
+    from utils import create_map
+
+    col1, col2 = st.columns([1, 3])
+    with col1:
+        show_map = st.checkbox("Show Interactive Map", value=True)
+    with col2:
+        map_style = st.radio(
+            "Map Rendering",
+            list(MAP_RENDER_MODES),
+            horizontal=True,
+            help="Density Overlay draws the forest density as a single image and loads much faster. " + (
+                "Density Tiles streams it from the tile server at every zoom level." if TILES_AVAILABLE else
+                "Density Tiles is unavailable: set FOREST_TILE_URL to an address browsers can reach "
+                "(https when the app is served over https)."
+            )
+        )
+    if not show_map:
+        return
+
+    st.markdown('<div class="map-container">', unsafe_allow_html=True)
+    st.markdown("""
+        <div class="map-header">
+            <h2>Interactive Forest Cover Map</h2>
+            <p>Green areas indicate higher forest density</p>
+        </div>
+    """, unsafe_allow_html=True)
+    render_mode = MAP_RENDER_MODES[map_style]
+    with run_timer().stage('map') as stage:
+        map_html = create_map(location, coordinates, current_cover, render_mode=render_mode)
+        components.html(map_html, height=600, scrolling=True)
+        stage.set_payload(map_html)
+    st.markdown('</div>', unsafe_allow_html=True)
+
+
+@timed_fragment
+def analysis_fragment(location: str, start_year: int):
+    """Rate chart and statistics table, depends on (location, start_year)"""
+    from utils import location_rate_chart
+
+    series = get_forest_series(location)
+    data = series.to_frame(start_year)
+
+    if st.checkbox("Show Deforestation Rates", value=True):
+        st.markdown('<div class="analysis-container">', unsafe_allow_html=True)
+        with run_timer().stage('rate_chart') as stage:
+            rate_chart = location_rate_chart(location, start_year)
+            st.plotly_chart(rate_chart, use_container_width=True)
+            stage.set_payload(rate_chart)
+        st.markdown('</div>', unsafe_allow_html=True)
+
+    st.markdown("### 📊 Detailed Statistics")
+    with run_timer().stage('table'):
+        render_statistics_table(data)
+
+
+def render_statistics_table(data):
+    """Paginated statistics table, formatted by the browser through column_config instead of a Styler"""
+    total = len(data)
+    pages = max(1, -(-total // TABLE_PAGE_SIZE))
+    if pages > 1:
+        page = st.number_input("Page", min_value=1, max_value=pages, value=1, step=1)
+        start = (page - 1) * TABLE_PAGE_SIZE
+        data = data.iloc[start:start + TABLE_PAGE_SIZE]
+        st.caption(f"Rows {start + 1:,}–{start + len(data):,} of {total:,}")
+    st.dataframe(
+        data,
+        column_config={
+            'year': st.column_config.NumberColumn(format="%d"),
+            'forest_cover_percentage': st.column_config.ProgressColumn(
+                format="%.1f%%", min_value=0, max_value=100
+            ),
+            'deforestation_rate': st.column_config.NumberColumn(format="%.2f"),
+            'total_area': st.column_config.NumberColumn(format="%.0f")
+        },
+        use_container_width=True
+    )
+
+
+@timed_fragment
+def compare_fragment(location: str, start_year: int):
+    """Trend and rate charts overlaying many locations, depends on (locations, start_year)"""
+    from utils import comparison_charts
+
+    text = st.text_area(
+        "Locations to compare, one per line",
+        value=location,
+        height=150,
+        help="Paste dozens or hundreds of locations, large comparisons are drawn with WebGL"
+    )
+    # Keep the first occurrence of every name, in order
+    names = tuple(dict.fromkeys(line.strip() for line in text.splitlines() if line.strip()))
+    if not names:
+        st.info("Enter at least one location to compare.")
+        return
+
+    with run_timer().stage('compare') as stage:
+        trend_chart, rate_chart = comparison_charts(names, start_year)
+        # Keyed, as a single location would draw the same figures as the other tabs
+        st.plotly_chart(trend_chart, use_container_width=True, key='compare_trend_chart')
+        st.plotly_chart(rate_chart, use_container_width=True, key='compare_rate_chart')
+        stage.set_payload(trend_chart)
+
+
+@timed_fragment
+def regions_fragment(start_year: int):
+    """Area-weighted rollups of every known location, depends on start_year"""
+    from utils.rollups import get_region_rollups
+
+    st.markdown("### 🌍 Regional Rollups")
+    col1, col2 = st.columns(2)
+    with col1:
+        grouping = ROLLUP_GROUPINGS[st.radio("Group By", list(ROLLUP_GROUPINGS), horizontal=True)]
+    with col2:
+        depth = st.select_slider("Level", options=[1, 2, 3], value=1)
+
+    with run_timer().stage('rollups') as stage:
+        summary = get_region_rollups(grouping).summary(depth, start_year)
+        st.dataframe(
+            summary.sort_values('total_area', ascending=False),
+            column_config={
+                'total_area': st.column_config.NumberColumn("Total Area (ha)", format="%.0f"),
+                'forest_cover_percentage': st.column_config.ProgressColumn(
+                    "Forest Cover", format="%.1f%%", min_value=0, max_value=100
+                ),
+                'forest_loss_ha': st.column_config.NumberColumn(f"Loss Since {start_year} (ha)", format="%.0f")
+            },
+            hide_index=True,
+            use_container_width=True
+        )
+        stage.set_payload(summary)
+
+
+@timed_fragment
+def hotspots_fragment(start_year: int):
+    """Locations whose deforestation is accelerating or whose cover just dropped, depends on start_year"""
+    from utils.change_detection import ROLLING_WINDOW, get_change_detector
+
+    st.markdown("### 🔥 Deforestation Hotspots")
+    limit = st.select_slider("Show Top", options=[5, 10, 20, 50], value=10)
+    with run_timer().stage('hotspots') as stage:
+        hotspots = get_change_detector(start_year).hotspots(limit)
+        st.dataframe(
+            hotspots[['location', 'forest_cover_percentage', 'recent_rate', 'long_term_rate', 'trend_slope',
+                      'anomaly_score', 'accelerating', 'sudden_drop']],
+            column_config={
+                'location': st.column_config.TextColumn("Location"),
+                'forest_cover_percentage': st.column_config.ProgressColumn(
+                    "Forest Cover", format="%.1f%%", min_value=0, max_value=100
+                ),
+                'recent_rate': st.column_config.NumberColumn(f"{ROLLING_WINDOW}-Year Rate (%)", format="%.2f"),
+                'long_term_rate': st.column_config.NumberColumn(f"Rate Since {start_year} (%)", format="%.2f"),
+                'trend_slope': st.column_config.NumberColumn("Trend (pts/yr)", format="%.2f"),
+                'anomaly_score': st.column_config.NumberColumn("Anomaly Score", format="%.2f"),
+                'accelerating': st.column_config.CheckboxColumn("Accelerating"),
+                'sudden_drop': st.column_config.CheckboxColumn("Sudden Drop")
+            },
+            hide_index=True,
+            use_container_width=True
+        )
+        stage.set_payload(hotspots)
+
+
+@timed_fragment
+def export_fragment(location: str, start_year: int):
+    """Download button, the file is only encoded once the user asks for it"""
+    from utils.export import MIME_TYPES, export_bytes
+
+    col1, col2 = st.columns([1, 3])
+    with col1:
+        fmt = EXPORT_LABELS[st.selectbox("Export Format", list(EXPORT_LABELS), label_visibility="collapsed")]
+    export_key = (location, start_year, fmt)
+    with col2:
+        if st.session_state.get('_export_ready') != export_key:
+            st.button("📦 Prepare Dataset Download", on_click=st.session_state.__setitem__,
+                      args=('_export_ready', export_key))
+            return
+        with run_timer().stage('export') as stage:
+            payload = export_bytes(location, fmt, start_year)
+            stage.set_payload(payload)
+        st.download_button(
+            label=f"📥 Download Complete Dataset ({fmt.upper()})",
+            data=payload,
+            file_name=f'forest_data_{location.lower().replace(" ", "_")}.{fmt}',
+            mime=MIME_TYPES[fmt]
+        )
+
+
+# Load custom CSS, read from disk once per process
+st.markdown(f'<style>{read_asset("styles/custom.css")}</style>', unsafe_allow_html=True)
 
 # Background image and overlay
 st.markdown("""
@@ -53,13 +439,15 @@ with st.sidebar:
 
     # Show suggestions as the user types
     if location:
-        suggestions = get_location_suggestions(location)
+        with timer.stage('suggestions'):
+            suggestions = get_location_suggestions(location)
         if suggestions and location.lower() not in [s.lower() for s in suggestions]:
+            prefetch_suggestions(location, suggestions)
             st.markdown("### Suggestions:")
             for suggestion in suggestions:
                 if st.button(f"📍 {suggestion}", key=f"suggestion_{suggestion}"):
                     st.session_state.location = suggestion
-                    st.experimental_rerun()
+                    st.rerun()
 
     # Time range selector
     start_year = st.slider(
@@ -70,12 +458,6 @@ with st.sidebar:
         help="Choose the starting year for the analysis"
     )
 
-    # Add filters
-    st.markdown("### 📊 Display Options")
-    show_map = st.checkbox("Show Interactive Map", value=True)
-    show_trends = st.checkbox("Show Trend Analysis", value=True)
-    show_rates = st.checkbox("Show Deforestation Rates", value=True)
-
     # Add environmental impact section
     st.markdown("""
         <div class="sidebar-info">
@@ -97,104 +479,35 @@ if location:
 if location:
     try:
         with st.spinner('Analyzing forest data...'):
-            # Generate data for the location
-            data = generate_deforestation_data(location)
-            data = data[data['year'] >= start_year]
-            coordinates = get_location_coordinates(location)
-            latest_data = data.iloc[-1]
+            timer.context['location'] = location
+            with timer.stage('prefetch_wait'):
+                settle_prefetch(location)
+            # Slice the precomputed series for the location instead of regenerating it
+            with timer.stage('series'):
+                series = get_forest_series(location)
+                current_cover = series.forest_cover_at()
+            with timer.stage('coordinates'):
+                coordinates = get_location_coordinates(location)
 
-            # Create tabs with environmental styling
-            tab1, tab2, tab3 = st.tabs(["📊 Overview", "🗺️ Forest Map", "📈 Detailed Analysis"])
+            # Each tab reruns on its own when one of its widgets changes
+            tab1, tab2, tab3, tab4 = st.tabs(["📊 Overview", "🗺️ Forest Map", "📈 Detailed Analysis", "🔀 Compare"])
 
             with tab1:
-                st.markdown("""
-                    <div class="overview-header">
-                        <h2>Forest Health Overview</h2>
-                    </div>
-                """, unsafe_allow_html=True)
-
-                col1, col2, col3 = st.columns(3)
-
-                with col1:
-                    st.markdown(
-                        f"""
-                        <div class="stat-box">
-                            <h3>Current Forest Cover</h3>
-                            <h2>{latest_data['forest_cover_percentage']:.1f}%</h2>
-                            <p>of total area</p>
-                        </div>
-                        """,
-                        unsafe_allow_html=True
-                    )
-
-                with col2:
-                    st.markdown(
-                        f"""
-                        <div class="stat-box">
-                            <h3>Total Area</h3>
-                            <h2>{latest_data['total_area']:,} ha</h2>
-                            <p>monitored region</p>
-                        </div>
-                        """,
-                        unsafe_allow_html=True
-                    )
-
-                with col3:
-                    total_loss = data['forest_cover_percentage'].iloc[0] - data['forest_cover_percentage'].iloc[-1]
-                    st.markdown(
-                        f"""
-                        <div class="stat-box warning">
-                            <h3>Total Loss Since {start_year}</h3>
-                            <h2>{total_loss:.1f}%</h2>
-                            <p>forest cover reduction</p>
-                        </div>
-                        """,
-                        unsafe_allow_html=True
-                    )
-
-                if show_trends:
-                    st.markdown('<div class="chart-container">', unsafe_allow_html=True)
-                    trend_chart = create_trend_chart(data, f'Forest Cover Trends in {location}')
-                    st.plotly_chart(trend_chart, use_container_width=True)
-                    st.markdown('</div>', unsafe_allow_html=True)
+                overview_fragment(location, start_year)
 
             with tab2:
-                if show_map:
-                    st.markdown('<div class="map-container">', unsafe_allow_html=True)
-                    st.markdown("""
-                        <div class="map-header">
-                            <h2>Interactive Forest Cover Map</h2>
-                            <p>Green areas indicate higher forest density</p>
-                        </div>
-                    """, unsafe_allow_html=True)
-                    map_html = create_map(location, coordinates, latest_data['forest_cover_percentage'])
-                    components.html(map_html, height=600, scrolling=True)
-                    st.markdown('</div>', unsafe_allow_html=True)
+                map_fragment(location, coordinates, current_cover)
 
             with tab3:
-                if show_rates:
-                    st.markdown('<div class="analysis-container">', unsafe_allow_html=True)
-                    rate_chart = create_deforestation_rate_chart(data)
-                    st.plotly_chart(rate_chart, use_container_width=True)
-                    st.markdown('</div>', unsafe_allow_html=True)
-
-                st.markdown("### 📊 Detailed Statistics")
-                st.dataframe(
-                    data.style.format({
-                        'forest_cover_percentage': '{:.1f}%',
-                        'deforestation_rate': '{:.2f}',
-                        'total_area': '{:,.0f}'
-                    }).background_gradient(subset=['forest_cover_percentage'], cmap='RdYlGn'),
-                    use_container_width=True
-                )
+                analysis_fragment(location, start_year)
+
+            with tab4:
+                compare_fragment(location, start_year)
+                regions_fragment(start_year)
+                hotspots_fragment(start_year)
 
             # Export options with styled button
-            st.download_button(
-                label="📥 Download Complete Dataset (CSV)",
-                data=data.to_csv(index=False).encode('utf-8'),
-                file_name=f'forest_data_{location.lower().replace(" ", "_")}.csv',
-                mime='text/csv'
-            )
+            export_fragment(location, start_year)
 
     except Exception as e:
         st.error(f"An error occurred while processing your request: {str(e)}")
@@ -233,4 +546,8 @@ else:
         </div>
     """, unsafe_allow_html=True)
 
-st.markdown("</div>", unsafe_allow_html=True)  # Close content-overlay div
\ No newline at end of file
+st.markdown("</div>", unsafe_allow_html=True)  # Close content-overlay div
+timer.finish()
+if timer.enabled:
+    render_performance_panel(timer)
+start_prefetch()
@@ -0,0 +1,4 @@
+import os
+
+# Keep test runs out of the shared on-disk cache, set before utils is imported
+os.environ.setdefault('FOREST_TRACKER_DISK_CACHE', '0')
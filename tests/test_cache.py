@@ -0,0 +1,146 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from utils import cache as cache_module
+from utils.cache import DiskLRUCache, LRUCache, TieredCache, memoize
+from utils.data_generator import _generate_deforestation_data, generate_deforestation_data
+
+
+@pytest.fixture(autouse=True)
+def forget_test_caches():
+    """Keep caches created by a test out of clear_caches and cache_stats"""
+    registered = set(cache_module._registry)
+    yield
+    for name in set(cache_module._registry) - registered:
+        del cache_module._registry[name]
+
+
+@pytest.fixture
+def disk_cache_dir(tmp_path, monkeypatch):
+    """Turn the disk tier on in a private directory"""
+    monkeypatch.setattr(cache_module, 'DISK_CACHE_ENABLED', True)
+    monkeypatch.setattr(cache_module, 'DEFAULT_CACHE_DIR', tmp_path)
+    return tmp_path
+
+
+def test_lru_evicts_least_recently_used():
+    lru = LRUCache(max_entries=2)
+    lru.set('a', 1)
+    lru.set('b', 2)
+    assert lru.get('a') == 1  # b is now the oldest
+    lru.set('c', 3)
+    assert 'b' not in lru and 'a' in lru and 'c' in lru
+    assert (lru.hits, lru.misses, lru.evictions) == (1, 0, 1)
+    assert lru.get('b', 'missing') == 'missing'
+    assert lru.misses == 1
+
+
+def test_disk_cache_round_trip_and_eviction(tmp_path):
+    disk = DiskLRUCache(tmp_path, max_bytes=250)
+    for i in range(3):
+        disk.set(('key', i), bytes([i]) * 100)
+    # 300 bytes exceed the bound, the oldest entry goes
+    assert disk.get(('key', 0)) is None
+    assert disk.get(('key', 2)) == bytes([2]) * 100
+    assert len(disk) == 2 and disk.total_bytes == 200
+
+    reopened = DiskLRUCache(tmp_path, max_bytes=250)
+    assert len(reopened) == 2 and reopened.get(('key', 1)) == bytes([1]) * 100
+
+    reopened.delete(('key', 1))
+    assert reopened.get(('key', 1)) is None
+    reopened.clear()
+    assert len(reopened) == 0 and not list(tmp_path.glob('*.bin'))
+
+
+def test_disk_cache_skips_files_removed_while_scanning(tmp_path, monkeypatch):
+    DiskLRUCache(tmp_path).set(('key',), b'value')
+    listed = list(tmp_path.glob('*.bin')) + [tmp_path / 'evicted-by-another-worker.bin']
+    monkeypatch.setattr(Path, 'glob', lambda self, pattern: iter(listed))
+    disk = DiskLRUCache(tmp_path)
+    assert len(disk) == 1 and disk.total_bytes == 5
+
+
+def test_disk_cache_evicts_files_of_other_processes(tmp_path):
+    first = DiskLRUCache(tmp_path, max_bytes=250)
+    second = DiskLRUCache(tmp_path, max_bytes=250)
+    first.set(('key', 0), b'0' * 100)
+    first.set(('key', 1), b'1' * 100)
+    second.set(('key', 2), b'2' * 100)
+    # The second cache only wrote 100 bytes itself but sees the whole directory when evicting
+    assert sum(path.stat().st_size for path in tmp_path.glob('*.bin')) <= 250
+    assert second.get(('key', 2)) == b'2' * 100
+
+
+def test_tiered_cache_falls_back_to_disk(disk_cache_dir):
+    tiered = TieredCache('test_tiered', max_entries=4)
+    tiered.set(('a',), {'value': 1})
+    tiered.memory.clear()
+    assert tiered.get(('a',)) == {'value': 1}
+    assert tiered.disk_hits == 1
+
+    tiered.invalidate(('a',))
+    assert tiered.get(('a',), 'missing') == 'missing'
+
+
+def test_corrupt_disk_entry_is_dropped(disk_cache_dir):
+    tiered = TieredCache('test_corrupt')
+    tiered.disk.set((cache_module.CACHE_VERSION, 'test_corrupt', ('a',)), b'not a pickle')
+    assert tiered.get(('a',), 'missing') == 'missing'
+    assert tiered.disk_errors == 1
+    assert len(tiered.disk) == 0
+
+
+def test_memoize_keys_by_bound_arguments():
+    calls = []
+
+    @memoize('test_memoize', disk=False)
+    def area(location, scale=1):
+        calls.append((location, scale))
+        return len(location) * scale
+
+    assert area('Noida') == area('Noida', 1) == area(location='Noida', scale=1) == 5
+    assert area('Noida', 2) == 10
+    assert calls == [('Noida', 1), ('Noida', 2)]
+
+    area.invalidate('Noida')
+    area('Noida')
+    assert calls[-1] == ('Noida', 1) and len(calls) == 3
+
+
+def test_memoize_normalizes_location_arguments():
+    calls = []
+    year = [2024]
+
+    @memoize('test_locations', disk=False, extra_key=lambda: year[0], locations=('location',))
+    def series(location):
+        calls.append(location)
+        return normalize(location)
+
+    def normalize(location):
+        return ' '.join(location.lower().split())
+
+    assert series('Amazon Rainforest') == series('  amazon  RAINFOREST') == 'amazon rainforest'
+    assert len(calls) == 1
+    assert series.lookup('AMAZON rainforest') == 'amazon rainforest'
+
+    # A new year is a new key
+    year[0] = 2025
+    series('Amazon Rainforest')
+    assert len(calls) == 2
+
+
+def test_generate_returns_a_copy():
+    data = generate_deforestation_data('Noida')
+    data['forest_cover_percentage'] = 0.0
+    assert (generate_deforestation_data('Noida')['forest_cover_percentage'] > 0).all()
+
+
+def test_location_spelling_shares_the_series():
+    data = generate_deforestation_data('Amazon Rainforest')
+    respelt = generate_deforestation_data('  amazon   RAINFOREST ')
+    np.testing.assert_array_equal(data['forest_cover_percentage'], respelt['forest_cover_percentage'])
+    assert respelt['location'].iloc[0] == '  amazon   RAINFOREST '
+    assert _generate_deforestation_data.lookup(' AMAZON rainforest', 2000) is not None
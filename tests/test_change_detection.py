@@ -0,0 +1,50 @@
+import pandas as pd
+import pytest
+
+from utils.change_detection import ChangeDetector, get_change_detector
+from utils.data_generator import SERIES_START_YEAR, simulate_deforestation
+from utils.gazetteer import get_gazetteer
+from utils.series import get_forest_series
+
+
+@pytest.fixture(scope='module')
+def batch():
+    return simulate_deforestation(get_gazetteer().names(), SERIES_START_YEAR)
+
+
+def build(batch, years: slice) -> ChangeDetector:
+    return ChangeDetector(batch.locations, batch.years[years], batch.forest_cover[:, years],
+                          batch.deforestation_rate[:, years])
+
+
+@pytest.mark.parametrize('appended', [1, 2, 5])
+def test_append_year_matches_rebuild(batch, appended):
+    detector = build(batch, slice(0, -appended))
+    for column in range(-appended, 0):
+        detector.append_year(batch.forest_cover[:, column], batch.deforestation_rate[:, column])
+
+    rebuilt = build(batch, slice(None))
+    assert detector.last_year == rebuilt.last_year
+    pd.testing.assert_frame_equal(detector.scores(), rebuilt.scores(), rtol=1e-9, atol=1e-9)
+
+
+def test_append_year_rejects_wrong_shape(batch):
+    detector = build(batch, slice(None))
+    with pytest.raises(ValueError):
+        detector.append_year(batch.forest_cover[:3, -1], batch.deforestation_rate[:3, -1])
+
+
+def test_hotspots_are_the_highest_scores(batch):
+    detector = build(batch, slice(None))
+    expected = detector.scores().sort_values('anomaly_score', ascending=False, kind='stable').head(5)
+    assert detector.hotspots(5)['location'].tolist() == expected['location'].tolist()
+
+
+def test_detector_slices_the_series_the_app_shows():
+    detector = get_change_detector(2015)
+    assert detector.first_year == 2015
+    scores = detector.scores().set_index('location')
+    for location in ('Noida', 'Amazon Rainforest'):
+        series = get_forest_series(location)
+        assert scores.loc[location, 'forest_cover_percentage'] == pytest.approx(series.forest_cover_at(), abs=1e-4)
+        assert scores.loc[location, 'long_term_rate'] == pytest.approx(series.mean_rate(2015), abs=1e-4)
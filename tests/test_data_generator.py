@@ -0,0 +1,37 @@
+import numpy as np
+
+from utils.data_generator import (
+    calculate_area,
+    generate_deforestation_data,
+    generate_deforestation_data_many,
+    simulate_deforestation
+)
+from utils.gazetteer import get_gazetteer
+
+LOCATIONS = ['Amazon Rainforest', 'Jim Corbett National Park', 'Noida', 'Western Ghats', 'Atlantis']
+
+
+def test_batch_rows_match_single_location():
+    batch = simulate_deforestation(LOCATIONS)
+    for row, location in enumerate(LOCATIONS):
+        data = generate_deforestation_data(location)
+        np.testing.assert_array_equal(batch.years, data['year'])
+        np.testing.assert_array_equal(batch.forest_cover[row], data['forest_cover_percentage'])
+        np.testing.assert_array_equal(batch.deforestation_rate[row], data['deforestation_rate'])
+        assert batch.total_area[row] == data['total_area'].iloc[0] == calculate_area(location)
+
+
+def test_many_matches_single_location():
+    many = generate_deforestation_data_many(LOCATIONS)
+    for location in LOCATIONS:
+        rows = many[many['location'] == location].reset_index(drop=True)
+        data = generate_deforestation_data(location)
+        np.testing.assert_array_equal(rows[data.columns].to_numpy(), data.to_numpy())
+
+
+def test_every_gazetteer_location_matches():
+    names = get_gazetteer().names()
+    batch = simulate_deforestation(names)
+    for row, location in enumerate(names):
+        np.testing.assert_array_equal(batch.forest_cover[row],
+                                      generate_deforestation_data(location)['forest_cover_percentage'])
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from utils.density import DENSITY_THRESHOLD, compute_density_field, sample_forest_clusters
+
+
+class NoVariation:
+    """Generator stand-in whose normal draws are their mean, leaving the deterministic factors"""
+
+    def normal(self, loc, scale, size):
+        return np.full(size, float(loc))
+
+
+def reference_cover(location, lat, lon, forest_cover, num_points=20, radius=20000):
+    """The original per-point loop of create_map with random_variation fixed at 1, keyed by grid index"""
+    grid_size = radius / num_points
+    cover = {}
+    for i in range(-num_points, num_points + 1):
+        for j in range(-num_points, num_points + 1):
+            point_lat = lat + (i * grid_size / 111111)
+            point_lon = lon + (j * grid_size / (111111 * np.cos(np.radians(lat))))
+            distance_from_coast = abs(point_lon - lon)
+            if distance_from_coast > 0.1:
+                continue
+
+            distance = np.sqrt((lat - point_lat)**2 + (lon - point_lon)**2)
+            max_distance = grid_size * (num_points / 2) / 111111
+            distance_factor = 1 - (distance / max_distance)**1.5
+            elevation = np.sin(point_lat * 15) * np.cos(point_lon * 15) * 0.3
+            moisture = np.cos(point_lat * 10 - point_lon * 10) * 0.2
+            terrain_factor = (
+                np.sin(point_lat * 15 + point_lon * 15) * 0.2 +
+                np.cos(point_lat * 25 - point_lon * 25) * 0.15 +
+                np.sin((point_lat * 35 + point_lon * 35)) * 0.1
+            )
+            environmental_factor = 1.5 + elevation + moisture + terrain_factor
+            base_density = 0.8 if "rainforest" in location.lower() else 0.6
+            local_cover = forest_cover * max(base_density, distance_factor) * environmental_factor
+            noise = np.sin(point_lat * 25) * np.cos(point_lon * 25) * 0.1
+            local_cover *= (1 + noise)
+            cover[(i + num_points, j + num_points)] = max(0, min(100, local_cover))
+    return cover
+
+
+@pytest.mark.parametrize('location, coordinates, forest_cover', [
+    ('Amazon Rainforest', (-3.4653, -62.2159), 83.9),
+    ('Noida', (28.5355, 77.3910), 9.2),
+    ('Tromso', (69.6492, 18.9553), 40.0),  # High latitude, more of the grid is sea
+])
+def test_density_field_matches_original_loop(location, coordinates, forest_cover):
+    field = compute_density_field(location, coordinates, forest_cover, rng=NoVariation())
+    expected = reference_cover(location, *coordinates, forest_cover)
+
+    assert set(zip(*np.nonzero(field.land))) == set(expected)
+    for index, cover in expected.items():
+        assert field.cover[index] == pytest.approx(cover, rel=1e-12, abs=1e-12)
+
+
+def test_clusters_only_on_visible_land():
+    field = compute_density_field('Noida', (28.5355, 77.3910), 9.2, rng=np.random.default_rng(0))
+    clusters = sample_forest_clusters(field, np.random.default_rng(0))
+    visible = int((field.land & (field.cover > DENSITY_THRESHOLD)).sum())
+    # Three to five markers per visible point, as in the loop
+    assert 3 * visible <= len(clusters.lat) <= 5 * visible
+    assert (clusters.opacity <= 0.75).all()
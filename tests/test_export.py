@@ -0,0 +1,133 @@
+import io
+import json
+from datetime import datetime
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from utils.data_generator import generate_deforestation_data
+from utils.export import (
+    MANIFEST_NAME,
+    export_bytes,
+    export_file,
+    export_series,
+    iter_export,
+    main,
+    part_path,
+    series_table
+)
+
+LOCATIONS = ['Amazon Rainforest', 'Noida', 'Western Ghats', 'Atlantis', 'Sundarbans']
+
+
+def read_download(payload: bytes, fmt: str) -> pd.DataFrame:
+    if fmt == 'csv':
+        return pd.read_csv(io.BytesIO(payload), float_precision='round_trip')
+    if fmt == 'parquet':
+        return pq.read_table(pa.BufferReader(payload)).to_pandas()
+    return pa.ipc.open_file(pa.BufferReader(payload)).read_all().to_pandas()
+
+
+@pytest.mark.parametrize('fmt', ['csv', 'parquet', 'arrow'])
+@pytest.mark.parametrize('start_year', [None, 2000, 2015])
+def test_download_matches_generator_and_cli(fmt, start_year):
+    location = 'Amazon Rainforest'
+    download = read_download(export_bytes.__wrapped__(location, fmt, start_year), fmt)
+
+    expected = generate_deforestation_data(location)
+    expected = expected[expected['year'] >= (start_year or 2000)].reset_index(drop=True)
+    pd.testing.assert_frame_equal(download, expected, check_exact=True, check_dtype=False)
+
+    cli = series_table([location], start_year or 2000).to_pandas()
+    pd.testing.assert_frame_equal(download, cli, check_exact=True, check_dtype=False)
+
+
+def test_download_clamps_the_range():
+    download = read_download(export_bytes.__wrapped__('Noida', 'csv', 1990, 2005), 'csv')
+    assert download['year'].tolist() == list(range(2000, 2006))
+    download = read_download(export_bytes.__wrapped__('Noida', 'csv', 2100), 'csv')
+    assert len(download) == 1
+
+
+def read_parts(output_dir, fmt: str = 'parquet') -> pa.Table:
+    return pa.concat_tables(pq.read_table(path) for path in sorted(output_dir.glob(f'part-*.{fmt}')))
+
+
+@pytest.mark.parametrize('start_year', [2000, 2012])
+def test_part_files_round_trip(tmp_path, start_year):
+    rows = export_series(LOCATIONS, tmp_path, 'parquet', chunk_size=2, workers=1, start_year=start_year)
+    assert len(list(tmp_path.glob('part-*.parquet'))) == 3
+    assert (tmp_path / '_SUCCESS').exists()
+
+    exported = read_parts(tmp_path)
+    assert rows == exported.num_rows
+    assert exported.equals(series_table(LOCATIONS, start_year))
+
+    manifest = json.loads((tmp_path / MANIFEST_NAME).read_text())
+    assert (manifest['start_year'], manifest['end_year']) == (start_year, datetime.now().year)
+    assert manifest['locations'] == len(LOCATIONS)
+
+
+def test_rerun_resumes_missing_parts(tmp_path):
+    export_series(LOCATIONS, tmp_path, 'parquet', chunk_size=2, workers=1)
+    finished = part_path(tmp_path, 0, 'parquet')
+    finished_mtime = finished.stat().st_mtime_ns
+    # An interrupted run leaves parts missing and no _SUCCESS
+    part_path(tmp_path, 1, 'parquet').unlink()
+    (tmp_path / '_SUCCESS').unlink()
+
+    rows = export_series(LOCATIONS, tmp_path, 'parquet', chunk_size=2, workers=1)
+    assert rows == len(series_table(LOCATIONS[2:4]))
+    assert finished.stat().st_mtime_ns == finished_mtime
+    assert (tmp_path / '_SUCCESS').exists()
+    assert read_parts(tmp_path).equals(series_table(LOCATIONS))
+
+
+def test_different_export_in_directory_is_refused(tmp_path):
+    export_series(LOCATIONS, tmp_path, 'parquet', chunk_size=2, workers=1)
+    with pytest.raises(ValueError):
+        export_series(LOCATIONS, tmp_path, 'parquet', chunk_size=2, workers=1, start_year=2010)
+    with pytest.raises(ValueError):
+        export_series(LOCATIONS[:-1], tmp_path, 'parquet', chunk_size=2, workers=1)
+
+
+def test_cli_reads_a_location_file(tmp_path):
+    names = tmp_path / 'locations.txt'
+    names.write_text('\n'.join(LOCATIONS) + '\n\n')
+    output_dir = tmp_path / 'out'
+    main([str(names), str(output_dir), '--format', 'csv', '--chunk-size', '10', '--workers', '1',
+          '--start-year', '2020'])
+    exported = pd.read_csv(part_path(output_dir, 0, 'csv'), float_precision='round_trip')
+    pd.testing.assert_frame_equal(exported, series_table(LOCATIONS, 2020).to_pandas(), check_exact=True,
+                                  check_dtype=False)
+
+
+@pytest.mark.parametrize('fmt', ['csv', 'parquet', 'arrow'])
+def test_streamed_file_equals_one_table(fmt):
+    # Two locations per chunk, so the file is assembled from three encoded pieces
+    pieces = list(iter_export(LOCATIONS, fmt, chunk_size=2, start_year=2010))
+    assert len(pieces) >= 3
+    exported = read_download(b''.join(pieces), fmt)
+    pd.testing.assert_frame_equal(exported, series_table(LOCATIONS, 2010).to_pandas(), check_exact=True,
+                                  check_dtype=False)
+    if fmt == 'csv':
+        assert b''.join(pieces).count(b'forest_cover_percentage') == 1
+
+
+def test_export_file_writes_the_stream(tmp_path):
+    path = tmp_path / 'all.parquet'
+    sizes = []
+    size = export_file(LOCATIONS, path, 'parquet', chunk_size=2, progress=sizes.append)
+    assert size == path.stat().st_size == sizes[-1]
+    assert pq.read_table(path).equals(series_table(LOCATIONS))
+    assert [p.name for p in tmp_path.iterdir()] == ['all.parquet']
+
+
+def test_downloads_are_encoded_once():
+    export_bytes.invalidate('Sundarbans', 'parquet', 2005)
+    first = export_bytes('Sundarbans', 'parquet', 2005)
+    assert export_bytes('Sundarbans', 'parquet', 2005) is first
+    with pytest.raises(ValueError):
+        export_bytes('Sundarbans', 'xlsx')
@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from utils.forecast import forecast_forest_cover, simulate_paths
+from utils.series import get_forest_series
+
+LOCATIONS = ['Amazon Rainforest', 'Noida', 'Atlantis']
+
+
+@pytest.mark.parametrize('location', LOCATIONS)
+def test_forecast_shape_and_start(location):
+    series = get_forest_series(location)
+    forecast = forecast_forest_cover(location, horizon=12, paths=500)
+    np.testing.assert_array_equal(forecast.years, np.arange(series.last_year, series.last_year + 13))
+    for band in (forecast.p5, forecast.p50, forecast.p95):
+        assert band.shape == (13,)
+        # Every path starts from the last observed cover
+        assert band[0] == pytest.approx(series.forest_cover_at())
+
+
+@pytest.mark.parametrize('location', LOCATIONS)
+def test_percentiles_are_ordered_and_bounded(location):
+    forecast = forecast_forest_cover(location, horizon=30, paths=2000)
+    assert (forecast.p5 <= forecast.p50).all() and (forecast.p50 <= forecast.p95).all()
+    assert (forecast.p5 >= 0).all() and (forecast.p95 <= 100).all()
+    # The model mostly declines, the median ends lower than it starts
+    assert forecast.p50[-1] < forecast.p50[0]
+
+
+def test_forecast_is_reproducible():
+    first = forecast_forest_cover.__wrapped__('Noida', horizon=10, paths=300)
+    second = forecast_forest_cover.__wrapped__('noida', horizon=10, paths=300)
+    np.testing.assert_array_equal(first.p50, second.p50)
+    seeded = forecast_forest_cover.__wrapped__('Noida', horizon=10, paths=300, seed=1)
+    assert not np.array_equal(first.p50, seeded.p50)
+
+
+def test_paths_stay_in_bounds():
+    cover = simulate_paths(1.0, 40, 1000, np.random.default_rng(0))
+    assert cover.shape == (1000, 41)
+    assert (cover >= 0).all() and (cover <= 100).all()
+    np.testing.assert_array_equal(cover[:, 0], 1.0)
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from utils.raster import DENSE_COVER, HISTOGRAM_BINS, get_forest_raster
+
+LOCATIONS = ['Jim Corbett National Park', 'Amazon Rainforest', 'Sundarbans']
+
+
+def brute_force_stats(raster, mask, level, threshold=DENSE_COVER):
+    """Mean, dense share and histogram of the level 0 cells under a coarse mask, cell by cell"""
+    base = raster.levels[0]
+    rows, cols = raster.shape
+    block = 2 ** level
+    selected = np.repeat(np.repeat(mask, block, axis=0), block, axis=1)[:rows, :cols]
+    cover = base.cover[selected & (base.land_cells > 0)].astype(np.float64)
+    histogram = np.histogram(cover, bins=HISTOGRAM_BINS)[0] * raster.cell_area_ha
+    return cover.mean(), np.count_nonzero(cover > threshold) / len(cover), histogram, len(cover)
+
+
+@pytest.mark.parametrize('location', LOCATIONS)
+@pytest.mark.parametrize('threshold', [DENSE_COVER, 35.5])
+def test_every_level_matches_level_zero(location, threshold):
+    raster = get_forest_raster(location)
+    for level in range(len(raster.levels)):
+        mask = raster.circle_mask(15000, level=level)
+        stats = raster.zonal_stats(mask, level, threshold)
+        mean, dense_fraction, histogram, land_cells = brute_force_stats(raster, mask, level, threshold)
+        assert stats.level == level
+        assert stats.area_ha == land_cells * raster.cell_area_ha
+        assert stats.mean_cover == pytest.approx(mean, rel=1e-5)
+        assert stats.dense_fraction == pytest.approx(dense_fraction, rel=1e-12)
+        np.testing.assert_array_equal(stats.histogram_ha, histogram)
+
+
+def test_polygon_levels_match_level_zero():
+    raster = get_forest_raster('Amazon Rainforest')
+    lat, lon = raster.coordinates
+    triangle = [(lat - 0.1, lon - 0.1), (lat + 0.12, lon), (lat - 0.05, lon + 0.15)]
+    for level in range(len(raster.levels)):
+        stats = raster.polygon_stats(triangle, level=level)
+        _, dense_fraction, histogram, _ = brute_force_stats(raster, raster.polygon_mask(triangle, level), level)
+        assert stats.dense_fraction == pytest.approx(dense_fraction, rel=1e-12)
+        np.testing.assert_array_equal(stats.histogram_ha, histogram)
+
+
+@pytest.mark.parametrize('location', LOCATIONS)
+def test_automatic_level_is_close_to_level_zero(location):
+    raster = get_forest_raster(location)
+    coarse = raster.circle_stats()
+    exact = raster.circle_stats(level=0)
+    assert coarse.level > 0
+    # Only the circle's edge differs, coarse cells are selected by their centers
+    assert coarse.dense_fraction == pytest.approx(exact.dense_fraction, abs=0.005)
+    assert coarse.mean_cover == pytest.approx(exact.mean_cover, abs=0.5)
+    assert coarse.histogram_ha.sum() == pytest.approx(coarse.area_ha)
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from utils.data_generator import simulate_deforestation
+from utils.rollups import RegionRollups, build_rollups
+
+PATHS = [
+    ('India', 'Uttar Pradesh', 'Noida'),
+    ('India', 'Uttar Pradesh', 'Greater Noida'),
+    ('India', 'Uttarakhand', 'Jim Corbett National Park'),
+    ('India', 'Karnataka', 'Western Ghats'),
+    ('Brazil', 'Amazonas', 'Amazon Rainforest'),
+]
+RANGES = [(None, None), (2005, 2015), (2010, 2010), (1990, 2100)]
+
+
+def assert_same_rollups(actual: RegionRollups, expected: RegionRollups):
+    assert set(actual.nodes) == set(expected.nodes)
+    for path in expected.nodes:
+        assert actual.area(path) == pytest.approx(expected.area(path))
+        assert actual.forest_cover(path) == pytest.approx(expected.forest_cover(path))
+        for start, end in RANGES:
+            assert actual.mean_cover(path, start, end) == pytest.approx(expected.mean_cover(path, start, end))
+            loss = expected.forest_loss(path, start, end)
+            assert actual.forest_loss(path, start, end) == pytest.approx(loss, abs=1e-6)
+            assert actual.mean_rate(path, start, end) == pytest.approx(expected.mean_rate(path, start, end))
+
+
+def test_rollups_match_site_sums():
+    rollups = build_rollups(PATHS)
+    batch = simulate_deforestation([path[-1] for path in PATHS])
+    rows = [0, 1]  # The two Uttar Pradesh sites
+    forest = (batch.total_area[rows, None] * batch.forest_cover[rows] / 100).sum(axis=0)
+    area = batch.total_area[rows].sum()
+    assert rollups.area(('India', 'Uttar Pradesh')) == pytest.approx(area)
+    assert rollups.forest_cover(('India', 'Uttar Pradesh'), 2010) == pytest.approx(100 * forest[10] / area)
+
+
+def test_update_site_matches_rebuild():
+    batch = simulate_deforestation([path[-1] for path in PATHS])
+    rollups = RegionRollups(batch.years, PATHS, batch.total_area, batch.forest_cover, batch.deforestation_rate)
+
+    # Give the Noida site another location's series and area
+    replacement = simulate_deforestation(['Sundarbans'])
+    rollups.update_site(PATHS[0], replacement.forest_cover[0], replacement.deforestation_rate[0],
+                        replacement.total_area[0])
+
+    forest_cover = batch.forest_cover.copy()
+    deforestation_rate = batch.deforestation_rate.copy()
+    total_area = batch.total_area.copy()
+    forest_cover[0] = replacement.forest_cover[0]
+    deforestation_rate[0] = replacement.deforestation_rate[0]
+    total_area[0] = replacement.total_area[0]
+    rebuilt = RegionRollups(batch.years, PATHS, total_area, forest_cover, deforestation_rate)
+
+    assert_same_rollups(rollups, rebuilt)
+    np.testing.assert_allclose(rollups.summary(2)['forest_loss_ha'], rebuilt.summary(2)['forest_loss_ha'])
+
+
+def test_update_unknown_site_raises():
+    rollups = build_rollups(PATHS)
+    with pytest.raises(KeyError):
+        rollups.update_site(('India', 'Uttar Pradesh'), [], [], 1.0)
@@ -0,0 +1,86 @@
+import pyarrow as pa
+import pytest
+
+from utils.data_generator import get_location_suggestions
+from utils.gazetteer import Gazetteer, StringView, build_gazetteer, search_index_path
+from utils.search import EXACT, FUZZY, NAME_PREFIX, SUBSTRING, WORD_PREFIX, LocationIndex, write_location_index
+from utils.seeding import normalize_location
+
+NAMES = ['Park', 'Parkview', 'Park Lane', 'Central Park', 'Spark', 'Amazon Rainforest', 'Congo Rainforest',
+         'Daintree Rainforest', 'Noida', 'Greater Noida']
+
+
+@pytest.fixture(scope='module')
+def index():
+    return LocationIndex(NAMES)
+
+
+def test_match_classes_rank_in_order(index):
+    assert index.search('park') == [('Park', EXACT), ('Parkview', NAME_PREFIX), ('Park Lane', NAME_PREFIX),
+                                    ('Central Park', WORD_PREFIX), ('Spark', SUBSTRING)]
+
+
+def test_shorter_then_alphabetical_within_a_class(index):
+    names = [name for name, _ in index.search('rainforest')]
+    assert names == ['Congo Rainforest', 'Amazon Rainforest', 'Daintree Rainforest']
+
+
+def test_query_is_normalized(index):
+    assert index.search('  GREATER   noida ') == [('Greater Noida', EXACT)]
+
+
+def test_limit(index):
+    assert len(index.search('park', limit=2)) == 2
+    assert index.search('park', limit=0) == []
+    assert index.search('   ') == []
+
+
+@pytest.mark.parametrize('query, expected', [
+    ('amazn rainforest', 'Amazon Rainforest'),  # Missing letter
+    ('amozon', 'Amazon Rainforest'),  # Wrong letter, partially typed
+    ('congo rainforset', 'Congo Rainforest'),  # Swapped letters
+])
+def test_typos_fall_back_to_fuzzy(index, query, expected):
+    results = index.search(query)
+    assert results[0] == (expected, FUZZY)
+
+
+def test_fuzzy_only_when_nothing_matches(index):
+    assert index.search('zzzzzz') == []
+    assert index.search('amazn', fuzzy=False) == []
+
+
+@pytest.mark.parametrize('query, expected', [
+    ('noida', ['Noida']),  # An exact match hides the rest
+    ('amzon rainforest', ['Amazon Rainforest']),
+    ('jim corbet', ['Jim Corbett National Park']),
+    ('westrn ghats', ['Western Ghats']),
+])
+def test_suggestions(query, expected):
+    assert get_location_suggestions(query)[:len(expected)] == expected
+
+
+@pytest.mark.parametrize('query', ['park', 'pa', 'p', 'ark', 'rainforest', 'noida', 'amazn rainforest', 'zzzzzz'])
+def test_mapped_index_matches_in_memory(index, tmp_path, query):
+    keys = [normalize_location(name) for name in NAMES]
+    path = tmp_path / 'names.search.arrow'
+    write_location_index(keys, path)
+    mapped = LocationIndex.open(path, StringView(pa.array(NAMES)), StringView(pa.array(keys)))
+    assert mapped.search(query) == index.search(query)
+    with pytest.raises(ValueError):
+        LocationIndex.open(path, NAMES[:-1], keys[:-1])
+
+
+def test_gazetteer_build_writes_the_index(tmp_path):
+    csv_path = tmp_path / 'places.csv'
+    csv_path.write_text('name,lat,lon\nCafé Zürich,47.37,8.54\nNoida,28.53,77.39\nGreater Noida,28.47,77.50\n')
+    build_gazetteer(csv_path, tmp_path / 'places.arrow')
+    gazetteer = Gazetteer(tmp_path / 'places.arrow')
+    assert list(gazetteer.strings('name')) == gazetteer.names()
+
+    path = search_index_path(gazetteer.path)
+    assert path.name == 'places.search.arrow'
+    index = LocationIndex.open(path, gazetteer.strings('name'), gazetteer.strings('key'))
+    assert index.search('noida') == [('Noida', EXACT), ('Greater Noida', WORD_PREFIX)]
+    assert index.search('zurich', fuzzy=False) == []
+    assert index.search('rich') == [('Café Zürich', SUBSTRING)]
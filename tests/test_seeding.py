@@ -0,0 +1,48 @@
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from utils.data_generator import calculate_area, simulate_deforestation
+from utils.seeding import location_rng, location_seed, normalize_location, stable_seed
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def test_seed_is_the_same_in_another_process():
+    code = "from utils.seeding import location_seed; print(location_seed('Amazon Rainforest'))"
+    # PYTHONHASHSEED differs per interpreter, the seed must not
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+                            cwd=ROOT, env={'PYTHONHASHSEED': '12345', 'PYTHONPATH': str(ROOT)}).stdout
+    assert int(output) == location_seed('Amazon Rainforest')
+
+
+def test_seed_depends_on_normalized_name_and_stream():
+    assert normalize_location('  Amazon   RAINFOREST ') == 'amazon rainforest'
+    assert location_seed('Amazon Rainforest') == location_seed(' amazon  rainforest')
+    assert location_seed('Amazon Rainforest') != location_seed('Amazon Rainforest', 'coordinates')
+    assert location_seed('Amazon Rainforest') != location_seed('Congo Rainforest')
+    assert 0 <= stable_seed('a', 1) < 2 ** 64
+
+
+def test_generators_are_independent():
+    first = location_rng('Noida')
+    first.random(5)
+    fresh = np.random.default_rng(location_seed('Noida'))
+    np.testing.assert_array_equal(location_rng('Noida').random(3), fresh.random(3))
+
+
+def test_area_is_the_series_first_draw():
+    batch = simulate_deforestation(['Noida', 'Sundarbans'])
+    assert list(batch.total_area) == [calculate_area('Noida'), calculate_area('Sundarbans')]
+
+
+def test_concurrent_generation_matches_sequential():
+    locations = ['Amazon Rainforest', 'Noida', 'Western Ghats', 'Atlantis'] * 8
+    expected = [simulate_deforestation([location]).forest_cover[0] for location in locations]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda location: simulate_deforestation([location]).forest_cover[0], locations))
+    for result, series in zip(results, expected):
+        np.testing.assert_array_equal(result, series)
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from utils.data_generator import generate_deforestation_data
+from utils.series import ForestSeries, get_forest_series
+
+LOCATIONS = ['Amazon Rainforest', 'Noida', 'Atlantis']
+RANGES = [(None, None), (2000, 2000), (2005, 2015), (2010, None), (None, 2012), (1990, 2100), (2015, 2005)]
+
+
+def frame_slice(data, start_year, end_year):
+    """The rows a range query covers, clamped like the series clamps it"""
+    first, last = data['year'].iloc[0], data['year'].iloc[-1]
+    start = min(max(first if start_year is None else start_year, first), last)
+    end = min(max(last if end_year is None else end_year, start), last)
+    return data[(data['year'] >= start) & (data['year'] <= end)]
+
+
+@pytest.mark.parametrize('location', LOCATIONS)
+@pytest.mark.parametrize('start_year, end_year', RANGES)
+def test_range_queries_match_frame(location, start_year, end_year):
+    series = get_forest_series(location)
+    rows = frame_slice(generate_deforestation_data(location), start_year, end_year)
+    cover = rows['forest_cover_percentage'].to_numpy()
+    rate = rows['deforestation_rate'].to_numpy()
+
+    assert series.total_loss(start_year, end_year) == pytest.approx(cover[0] - cover[-1], abs=1e-4)
+    assert series.total_rate(start_year, end_year) == pytest.approx(rate.sum(), abs=1e-4)
+    assert series.mean_rate(start_year, end_year) == pytest.approx(rate.mean(), abs=1e-4)
+    np.testing.assert_allclose(series.cumulative_loss(start_year, end_year), np.cumsum(rate), atol=1e-4)
+
+    # to_frame holds the series' float32 values exactly, nothing else is lost
+    frame = series.to_frame(start_year, end_year)
+    np.testing.assert_array_equal(frame['year'], rows['year'])
+    np.testing.assert_array_equal(frame['forest_cover_percentage'], cover.astype(np.float32))
+    np.testing.assert_array_equal(frame['deforestation_rate'], rate.astype(np.float32))
+    np.testing.assert_array_equal(frame['total_area'], rows['total_area'])
+
+
+@pytest.mark.parametrize('location', LOCATIONS)
+def test_cover_at_matches_frame(location):
+    series = get_forest_series(location)
+    data = generate_deforestation_data(location)
+    for year, cover in zip(data['year'], data['forest_cover_percentage']):
+        assert series.forest_cover_at(year) == pytest.approx(cover, abs=1e-4)
+    assert series.forest_cover_at() == pytest.approx(data['forest_cover_percentage'].iloc[-1], abs=1e-4)
+
+
+def test_from_frame_round_trips():
+    data = generate_deforestation_data('Western Ghats')
+    series = ForestSeries.from_frame(data)
+    assert (series.first_year, series.last_year) == (data['year'].iloc[0], data['year'].iloc[-1])
+    assert series.total_area == data['total_area'].iloc[0]
+    rate = data['deforestation_rate'].to_numpy(np.float32)
+    np.testing.assert_array_equal(series.to_frame()['deforestation_rate'], rate)
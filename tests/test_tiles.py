@@ -0,0 +1,118 @@
+import socket
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from utils import tiles
+from utils.cache import DiskLRUCache
+from utils.tiles import MAX_TILE_ZOOM, SERVER_MARKER, _serve, ensure_tile_server, tiles_available
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+# Zoom 12 tile holding the Noida coordinates
+NOIDA_TILE = (12, 2928, 1709)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture(scope='module')
+def server():
+    port = free_port()
+    ready = threading.Event()
+    errors = []
+    threading.Thread(target=_serve, args=('127.0.0.1', port, ready, errors), daemon=True).start()
+    ready.wait(timeout=5)
+    assert not errors
+    return f'http://127.0.0.1:{port}'
+
+
+@pytest.fixture
+def tile_cache(tmp_path, monkeypatch):
+    cache = DiskLRUCache(tmp_path, max_bytes=1024 * 1024)
+    monkeypatch.setattr(tiles, '_tile_cache', cache)
+    return cache
+
+
+def fetch(url: str):
+    try:
+        with urllib.request.urlopen(url, timeout=30) as response:
+            return response.status, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, b''
+
+
+def test_serves_and_caches_a_tile(server, tile_cache):
+    z, x, y = NOIDA_TILE
+    status, body = fetch(f'{server}/tiles/{z}/{x}/{y}.png?location=Noida&forest_cover=9.2')
+    assert status == 200 and body.startswith(PNG_SIGNATURE)
+    assert len(tile_cache) == 1
+    assert fetch(f'{server}/tiles/{z}/{x}/{y}.png?location=noida&forest_cover=9.2') == (200, body)
+    assert len(tile_cache) == 1
+
+
+@pytest.mark.parametrize('z, x, y', [(MAX_TILE_ZOOM + 1, 0, 0), (3, 8, 0), (3, 0, 8), (30, 0, 0)])
+def test_tiles_outside_the_pyramid_are_404(server, tile_cache, z, x, y):
+    assert fetch(f'{server}/tiles/{z}/{x}/{y}.png?location=Noida&forest_cover=9.2')[0] == 404
+
+
+@pytest.mark.parametrize('query', [
+    'location=Noida&forest_cover=nan',
+    'location=Noida&forest_cover=inf',
+    'location=Noida&forest_cover=-1',
+    'location=Noida&forest_cover=101',
+    'location=Noida&forest_cover=abc',
+    'forest_cover=9.2',
+])
+def test_invalid_arguments_are_400(server, tile_cache, query):
+    z, x, y = NOIDA_TILE
+    assert fetch(f'{server}/tiles/{z}/{x}/{y}.png?{query}')[0] == 400
+    assert len(tile_cache) == 0
+
+
+def test_empty_tiles_are_not_cached(server, tile_cache):
+    status, body = fetch(f'{server}/tiles/3/0/0.png?location=Noida&forest_cover=9.2')
+    assert status == 200 and body == tiles.empty_tile()
+    assert len(tile_cache) == 0
+
+
+def test_health_identifies_the_server(server):
+    assert fetch(f'{server}/health') == (200, SERVER_MARKER)
+
+
+def test_reuses_a_tile_server_already_on_the_port(server, monkeypatch):
+    monkeypatch.setattr(tiles, '_server_url', None)
+    monkeypatch.delenv('FOREST_TILE_URL', raising=False)
+    port = int(server.rsplit(':', 1)[1])
+    assert ensure_tile_server(port=port, host='127.0.0.1') == server
+
+
+def test_refuses_a_port_held_by_something_else(monkeypatch):
+    monkeypatch.setattr(tiles, '_server_url', None)
+    with socket.socket() as holder:
+        holder.bind(('127.0.0.1', 0))
+        holder.listen()
+        with pytest.raises(RuntimeError):
+            ensure_tile_server(port=holder.getsockname()[1], host='127.0.0.1')
+
+
+@pytest.mark.parametrize('host, url, available', [
+    ('127.0.0.1', None, False),
+    ('localhost', None, False),
+    ('0.0.0.0', None, False),
+    ('::1', None, False),
+    ('10.0.0.5', None, True),
+    ('tiles.example.org', None, True),
+    ('127.0.0.1', 'https://tiles.example.org', True),
+])
+def test_tiles_available(monkeypatch, host, url, available):
+    monkeypatch.setattr(tiles, 'DEFAULT_TILE_HOST', host)
+    if url is None:
+        monkeypatch.delenv('FOREST_TILE_URL', raising=False)
+    else:
+        monkeypatch.setenv('FOREST_TILE_URL', url)
+    assert tiles_available() is available
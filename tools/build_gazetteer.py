@@ -0,0 +1,15 @@
+"""Build the memory-mapped gazetteer from a name,lat,lon CSV
+
+Usage: python tools/build_gazetteer.py locations.csv gazetteer.arrow
+
+Point FOREST_GAZETTEER at the output file to use it in the app.
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from utils.gazetteer import main  # noqa: E402
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,16 @@
+"""Export deforestation series for many locations without the UI
+
+Usage: python tools/export_series.py locations.txt exports/nightly --format parquet
+
+Generation runs across a process pool and every chunk of locations is written
+to its own part file. Re-running the same command resumes an interrupted export.
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from utils.export import main  # noqa: E402
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,47 @@
-from .data_generator import generate_deforestation_data, get_location_coordinates, get_location_suggestions
-from .visualization import create_trend_chart, create_map, create_deforestation_rate_chart
+from .data_generator import (
+    generate_deforestation_data,
+    generate_deforestation_data_many,
+    get_location_coordinates,
+    get_location_suggestions
+)
+from .series import ForestSeries, get_forest_series
+
+# Chart and map builders pull in plotly and folium, so they are imported on first use
+_LAZY_ATTRIBUTES = {
+    'create_trend_chart': 'visualization',
+    'create_map': 'visualization',
+    'create_deforestation_rate_chart': 'visualization',
+    'location_trend_chart': 'visualization',
+    'location_rate_chart': 'visualization',
+    'comparison_charts': 'visualization'
+}
 
 __all__ = [
     'generate_deforestation_data',
+    'generate_deforestation_data_many',
     'get_location_coordinates',
     'get_location_suggestions',
+    'ForestSeries',
+    'get_forest_series',
     'create_trend_chart',
     'create_map',
-    'create_deforestation_rate_chart'
-]
\ No newline at end of file
+    'create_deforestation_rate_chart',
+    'location_trend_chart',
+    'location_rate_chart',
+    'comparison_charts'
+]
+
+
+def __getattr__(name):
+    if name in _LAZY_ATTRIBUTES:
+        import importlib
+
+        module = importlib.import_module(f'.{_LAZY_ATTRIBUTES[name]}', __name__)
+        value = getattr(module, name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY_ATTRIBUTES))
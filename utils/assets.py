@@ -0,0 +1,11 @@
+from pathlib import Path
+
+from .cache import memoize
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+@memoize('assets', max_entries=16, disk=False)
+def read_asset(path: str) -> str:
+    """Read a static file relative to the repository root, once per process"""
+    return (ROOT / path).read_text(encoding='utf-8')
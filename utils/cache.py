@@ -0,0 +1,320 @@
+import functools
+import hashlib
+import inspect
+import os
+import pickle
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from .seeding import normalize_location
+
+DEFAULT_CACHE_DIR = Path(os.environ.get(
+    'FOREST_TRACKER_CACHE_DIR',
+    Path.home() / '.cache' / 'forest-tracker'
+))
+DISK_CACHE_ENABLED = os.environ.get('FOREST_TRACKER_DISK_CACHE', '1') != '0'
+CACHE_VERSION = 1  # Bump when generated output changes so stale disk entries are ignored
+DISK_RESCAN_SHARE = 0.1  # Share of max_bytes a process writes between rescans of a shared directory
+
+_MISSING = object()
+_registry = {}
+
+
+def cache_key_digest(key) -> str:
+    """Return a stable hex digest for a tuple of strings and numbers"""
+    return hashlib.sha256(repr(key).encode('utf-8')).hexdigest()
+
+
+class DiskLRUCache:
+    """Size-bounded byte store on disk that evicts the least recently used entries
+
+    Entries are written atomically, so several worker processes can share one
+    directory. Each process tracks sizes for the files it has seen and rescans
+    the directory after writing a tenth of max_bytes, so files written by other
+    processes count against max_bytes too. Between rescans the directory can
+    exceed max_bytes by up to a tenth of it per other process.
+    """
+
+    def __init__(self, directory, max_bytes: int = 256 * 1024 * 1024):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # file name -> size, least recently used first
+        self._total_bytes = 0
+        self._written_since_scan = 0
+
+        for name, size in self._scan():
+            self._entries[name] = size
+            self._total_bytes += size
+
+    def _path(self, key) -> Path:
+        return self.directory / f'{cache_key_digest(key)}.bin'
+
+    def get(self, key):
+        """Return the stored bytes for key, or None if it is not cached"""
+        path = self._path(key)
+        try:
+            value = path.read_bytes()
+        except FileNotFoundError:
+            with self._lock:
+                self._forget(path.name)
+            return None
+
+        with self._lock:
+            if path.name not in self._entries:
+                self._entries[path.name] = len(value)
+                self._total_bytes += len(value)
+            self._entries.move_to_end(path.name)
+        try:
+            os.utime(path)  # Keep recency across restarts
+        except OSError:
+            pass
+        return value
+
+    def set(self, key, value: bytes):
+        """Store value under key and evict old entries beyond max_bytes"""
+        path = self._path(key)
+        fd, tmp_name = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(value)
+        os.replace(tmp_name, path)
+
+        with self._lock:
+            self._forget(path.name)
+            self._entries[path.name] = len(value)
+            self._total_bytes += len(value)
+            self._written_since_scan += len(value)
+            if self._written_since_scan >= self.max_bytes * DISK_RESCAN_SHARE:
+                self._rescan()
+            self._evict()
+
+    def delete(self, key):
+        """Remove key from the cache if present"""
+        path = self._path(key)
+        with self._lock:
+            self._forget(path.name)
+        path.unlink(missing_ok=True)
+
+    def clear(self):
+        """Remove every entry from the cache"""
+        with self._lock:
+            for name in self._entries:
+                (self.directory / name).unlink(missing_ok=True)
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total_bytes
+
+    def _forget(self, name: str):
+        size = self._entries.pop(name, None)
+        if size is not None:
+            self._total_bytes -= size
+
+    def _scan(self) -> list:
+        """Return (name, size) for the entry files on disk, oldest first"""
+        found = []
+        for path in self.directory.glob('*.bin'):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue  # Evicted by another process while scanning
+            found.append((stat.st_mtime, path.name, stat.st_size))
+        return [(name, size) for _, name, size in sorted(found)]
+
+    def _rescan(self):
+        # Files this process has not seen go first, its own entries keep their order
+        on_disk = dict(self._scan())
+        entries = OrderedDict((name, size) for name, size in on_disk.items() if name not in self._entries)
+        for name in self._entries:
+            if name in on_disk:
+                entries[name] = on_disk[name]
+        self._entries = entries
+        self._total_bytes = sum(entries.values())
+        self._written_since_scan = 0
+
+    def _evict(self):
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            name, size = self._entries.popitem(last=False)
+            self._total_bytes -= size
+            (self.directory / name).unlink(missing_ok=True)
+
+
+class LRUCache:
+    """Bounded in-memory mapping that evicts the least recently used entry"""
+
+    def __init__(self, max_entries: int = 128):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._data = OrderedDict()
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+
+class TieredCache:
+    """In-process LRU backed by a pickled disk tier shared by all worker processes"""
+
+    def __init__(self, name: str, max_entries: int = 128, disk: bool = True,
+                 disk_bytes: int = 256 * 1024 * 1024):
+        self.name = name
+        self.memory = LRUCache(max_entries)
+        self.use_disk = disk and DISK_CACHE_ENABLED
+        self.disk_bytes = disk_bytes
+        self._disk = None
+        self._disk_lock = threading.Lock()
+        self.disk_hits = 0
+        self.disk_errors = 0
+        _registry[name] = self
+
+    @property
+    def disk(self):
+        """The disk tier, opened on first use so importing stays cheap"""
+        if self._disk is None and self.use_disk:
+            with self._disk_lock:
+                if self._disk is None:
+                    self._disk = DiskLRUCache(DEFAULT_CACHE_DIR / self.name, self.disk_bytes)
+        return self._disk
+
+    def get(self, key, default=None):
+        """Return the cached value from memory, then disk, or default"""
+        value = self.memory.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        if self.disk is not None:
+            payload = self.disk.get((CACHE_VERSION, self.name, key))
+            if payload is not None:
+                try:
+                    value = pickle.loads(payload)
+                except Exception:
+                    # Corrupt or incompatible entry, drop it and recompute
+                    self.disk_errors += 1
+                    self.disk.delete((CACHE_VERSION, self.name, key))
+                    return default
+                self.disk_hits += 1
+                self.memory.set(key, value)
+                return value
+        return default
+
+    def set(self, key, value):
+        self.memory.set(key, value)
+        if self.disk is not None:
+            self.disk.set((CACHE_VERSION, self.name, key), pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+
+    def get_or_compute(self, key, compute):
+        """Return the cached value for key, computing and storing it on a miss"""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            # Concurrent misses may both compute, the results are identical
+            value = compute()
+            self.set(key, value)
+        return value
+
+    def invalidate(self, key):
+        """Drop key from both tiers"""
+        self.memory.delete(key)
+        if self.disk is not None:
+            self.disk.delete((CACHE_VERSION, self.name, key))
+
+    def clear(self):
+        """Drop every entry from both tiers"""
+        self.memory.clear()
+        if self.use_disk:
+            self.disk.clear()
+
+    def stats(self) -> dict:
+        return {
+            'entries': len(self.memory),
+            'hits': self.memory.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.memory.misses - self.disk_hits,
+            'evictions': self.memory.evictions,
+            'disk_entries': len(self._disk) if self._disk is not None else 0,
+            'disk_bytes': self._disk.total_bytes if self._disk is not None else 0,
+        }
+
+
+def memoize(name: str, max_entries: int = 128, disk: bool = True, extra_key=None,
+            disk_bytes: int = 256 * 1024 * 1024, locations=()):
+    """Cache a function's results in a TieredCache keyed by its bound arguments
+
+    extra_key is called on every lookup and added to the key, for inputs such as
+    the current year that are not arguments. Arguments named in locations are
+    keyed by their normalized form, so spellings that share a seed share an
+    entry; only use it when the result does not show the spelling it was
+    built from. Cached values are shared between callers and must not be mutated.
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+        cache = TieredCache(name, max_entries, disk, disk_bytes)
+
+        def make_key(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            for argument in locations:
+                bound.arguments[argument] = normalize_location(bound.arguments[argument])
+            key = tuple(bound.arguments.items())
+            return key + ((extra_key(),) if extra_key is not None else ())
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return cache.get_or_compute(make_key(*args, **kwargs), lambda: func(*args, **kwargs))
+
+        wrapper.cache = cache
+        wrapper.invalidate = lambda *args, **kwargs: cache.invalidate(make_key(*args, **kwargs))
+        # Look up or store a result computed elsewhere, such as in another process
+        wrapper.lookup = lambda *args, **kwargs: cache.get(make_key(*args, **kwargs))
+        wrapper.store = lambda value, *args, **kwargs: cache.set(make_key(*args, **kwargs), value)
+        return wrapper
+    return decorator
+
+
+def cache_stats() -> dict:
+    """Return hit/miss/eviction counters for every registered cache"""
+    return {name: cache.stats() for name, cache in _registry.items()}
+
+
+def clear_caches():
+    """Invalidate every registered cache"""
+    for cache in _registry.values():
+        cache.clear()
@@ -0,0 +1,186 @@
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from typing import Sequence
+
+from .cache import memoize
+from .data_generator import SERIES_START_YEAR, DeforestationBatch, simulate_deforestation
+
+ROLLING_WINDOW = 3  # Years in the recent deforestation rate
+ACCELERATION_Z = 1.0  # Recent rate this many standard errors above the long-term mean flags acceleration
+DROP_Z = 2.0  # Latest annual cover drop this many standard deviations above the usual drop flags a sudden drop
+
+
+def rolling_mean(values: np.ndarray, window: int = ROLLING_WINDOW) -> np.ndarray:
+    """Trailing mean over window years of a (locations, years) matrix, NaN until a full window exists"""
+    values = np.asarray(values, dtype=float)
+    cumsum = np.cumsum(values, axis=1)
+    result = np.full(values.shape, np.nan)
+    if values.shape[1] >= window:
+        result[:, window - 1] = cumsum[:, window - 1]
+        result[:, window:] = cumsum[:, window:] - cumsum[:, :-window]
+        result[:, window - 1:] /= window
+    return result
+
+
+def trend_slope(years, values: np.ndarray) -> np.ndarray:
+    """Least-squares slope per year of every row of a (locations, years) matrix"""
+    t = np.asarray(years, dtype=float)
+    t = t - t.mean()
+    return np.asarray(values, dtype=float) @ t / np.dot(t, t)
+
+
+def _standardized(value, mean, variance, n):
+    """(value - mean) / sqrt(variance), 0 where the spread is zero or undefined"""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        score = (value - mean) / np.sqrt(variance)
+    return np.where((n > 1) & (variance > 0), score, 0.0)
+
+
+class ChangeDetector:
+    """Acceleration and sudden-drop scores for many locations, updated one year at a time
+
+    Keeps running sums per location of the rate, the annual cover drop and
+    the cover against the year, plus the last window of rates, so appending
+    a year of observations costs O(locations) and gives the same scores as a
+    rebuild over the whole (locations, years) matrix.
+    """
+
+    def __init__(self, locations: Sequence[str], years, forest_cover, deforestation_rate,
+                 window: int = ROLLING_WINDOW):
+        forest_cover = np.asarray(forest_cover, dtype=float)
+        deforestation_rate = np.asarray(deforestation_rate, dtype=float)
+        years = np.asarray(years)
+        if len(years) < window:
+            raise ValueError(f"Need at least {window} years, got {len(years)}")
+
+        self.locations = list(locations)
+        self.window = window
+        self.first_year = int(years[0])
+        self.last_year = int(years[-1])
+
+        # Long-term rate moments
+        self._rate_sum = deforestation_rate.sum(axis=1)
+        self._rate_sq_sum = np.square(deforestation_rate).sum(axis=1)
+        self._recent_rates = deforestation_rate[:, -window:].copy()  # Ring buffer, oldest at _head
+        self._head = 0
+
+        # Annual drops, positive when cover falls
+        drops = forest_cover[:, :-1] - forest_cover[:, 1:]
+        self._drop_sum = drops.sum(axis=1)
+        self._drop_sq_sum = np.square(drops).sum(axis=1)
+        self._latest_drop = drops[:, -1].copy() if drops.shape[1] else np.zeros(len(self.locations))
+        self._latest_cover = forest_cover[:, -1].copy()
+
+        # Regression sums with t counted from the first year
+        t = np.arange(len(years), dtype=float)
+        self._cover_sum = forest_cover.sum(axis=1)
+        self._cover_t_sum = forest_cover @ t
+
+    @classmethod
+    def from_batch(cls, batch: DeforestationBatch, window: int = ROLLING_WINDOW) -> 'ChangeDetector':
+        return cls(batch.locations, batch.years, batch.forest_cover, batch.deforestation_rate, window)
+
+    def __len__(self):
+        return len(self.locations)
+
+    @property
+    def n_years(self) -> int:
+        return self.last_year - self.first_year + 1
+
+    def append_year(self, forest_cover, deforestation_rate):
+        """Add the next year's cover and rate for every location, in the detector's location order"""
+        forest_cover = np.asarray(forest_cover, dtype=float)
+        deforestation_rate = np.asarray(deforestation_rate, dtype=float)
+        if forest_cover.shape != (len(self),) or deforestation_rate.shape != (len(self),):
+            raise ValueError(f"Expected one value per location ({len(self)})")
+
+        t = float(self.n_years)
+        self.last_year += 1
+        self._rate_sum += deforestation_rate
+        self._rate_sq_sum += np.square(deforestation_rate)
+        self._recent_rates[:, self._head] = deforestation_rate
+        self._head = (self._head + 1) % self.window
+
+        drop = self._latest_cover - forest_cover
+        self._drop_sum += drop
+        self._drop_sq_sum += np.square(drop)
+        self._latest_drop = drop
+        self._latest_cover = forest_cover.copy()
+
+        self._cover_sum += forest_cover
+        self._cover_t_sum += t * forest_cover
+
+    def recent_rate(self) -> np.ndarray:
+        """Mean deforestation rate over the last window years"""
+        return self._recent_rates.mean(axis=1)
+
+    def long_term_rate(self) -> np.ndarray:
+        """Mean deforestation rate over every year"""
+        return self._rate_sum / self.n_years
+
+    def trend_slope(self) -> np.ndarray:
+        """Least-squares change in cover percentage per year over every year"""
+        n = self.n_years
+        t_sum = n * (n - 1) / 2
+        t_sq_sum = (n - 1) * n * (2 * n - 1) / 6
+        return (n * self._cover_t_sum - t_sum * self._cover_sum) / (n * t_sq_sum - t_sum ** 2)
+
+    def acceleration_z(self) -> np.ndarray:
+        """Recent rate minus the long-term mean, in standard errors of a window mean"""
+        n = self.n_years
+        mean = self.long_term_rate()
+        variance = (self._rate_sq_sum - n * mean ** 2) / max(n - 1, 1)
+        return _standardized(self.recent_rate(), mean, np.maximum(variance, 0) / self.window, n)
+
+    def drop_z(self) -> np.ndarray:
+        """Latest annual cover drop against the usual drop, in standard deviations"""
+        n = self.n_years - 1
+        mean = self._drop_sum / max(n, 1)
+        variance = (self._drop_sq_sum - n * mean ** 2) / max(n - 1, 1)
+        return _standardized(self._latest_drop, mean, np.maximum(variance, 0), n)
+
+    def _score_columns(self) -> dict:
+        acceleration = self.acceleration_z()
+        drop = self.drop_z()
+        return {
+            'location': np.array(self.locations, dtype=object),
+            'forest_cover_percentage': self._latest_cover,
+            'recent_rate': self.recent_rate(),
+            'long_term_rate': self.long_term_rate(),
+            'trend_slope': self.trend_slope(),
+            'latest_drop': self._latest_drop,
+            'acceleration_z': acceleration,
+            'drop_z': drop,
+            'anomaly_score': np.maximum(acceleration, drop),
+            'accelerating': acceleration > ACCELERATION_Z,
+            'sudden_drop': drop > DROP_Z,
+        }
+
+    def scores(self) -> pd.DataFrame:
+        """One row per location with its rates, trend, scores and flags"""
+        return pd.DataFrame(self._score_columns())
+
+    def hotspots(self, limit: int = 20) -> pd.DataFrame:
+        """The limit locations with the highest anomaly scores, highest first"""
+        columns = self._score_columns()
+        anomaly = columns['anomaly_score']
+        limit = max(min(limit, len(anomaly)), 0)
+        top = np.argpartition(-anomaly, limit - 1)[:limit] if limit else np.array([], dtype=int)
+        top = top[np.argsort(-anomaly[top], kind='stable')]
+        return pd.DataFrame({name: values[top] for name, values in columns.items()})
+
+
+@memoize('change_detection', max_entries=8, disk=False, extra_key=lambda: datetime.now().year)
+def get_change_detector(start_year: int = SERIES_START_YEAR, window: int = ROLLING_WINDOW) -> ChangeDetector:
+    """Scores for every gazetteer location over the years from start_year, cached per process
+
+    The series are generated from SERIES_START_YEAR and sliced, so the scores
+    use the same numbers as the other tabs. At least window years are kept.
+    """
+    from .gazetteer import get_gazetteer
+
+    batch = simulate_deforestation(get_gazetteer().names(), SERIES_START_YEAR)
+    start = max(min(start_year - SERIES_START_YEAR, len(batch.years) - window), 0)
+    return ChangeDetector(batch.locations, batch.years[start:], batch.forest_cover[:, start:],
+                          batch.deforestation_rate[:, start:], window)
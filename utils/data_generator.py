@@ -1,141 +1,207 @@
 
 def calculate_area(location):
     """Calculate approximate area based on location name"""
-    location = location.lower()
-    if 'forest' in location:
-        return np.random.uniform(50000, 100000)
-    elif any(x in location for x in ['city', 'town', 'urban']):
-        return np.random.uniform(5000, 20000)
-    else:
-        return np.random.uniform(20000, 50000)
+    # Same first draw as the location's series stream, so both agree
+    return location_rng(location).uniform(*area_range(location))
 
 
 import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
+from typing import NamedTuple, Optional
+
+from .cache import memoize
+from .gazetteer import get_gazetteer
+from .search import EXACT, get_location_index
+from .seeding import location_rng, normalize_location
+
+URBAN_KEYWORDS = ["noida", "delhi", "gurgaon", "ghaziabad", "greater noida"]
+SERIES_START_YEAR = 2000  # Every series the app shows is generated from here and sliced, never regenerated
+
+
+class DeforestationBatch(NamedTuple):
+    """Columnar deforestation series for many locations"""
+    locations: list
+    years: np.ndarray
+    forest_cover: np.ndarray  # (locations, years)
+    deforestation_rate: np.ndarray  # (locations, years)
+    total_area: np.ndarray  # (locations,)
 
 def get_predefined_locations():
     """
     Return a dictionary of predefined locations with their coordinates
+
+    The locations live in the memory-mapped gazetteer, see utils/gazetteer.py.
     """
-    return {
-        # Major Indian Cities
-        "noida": (28.5355, 77.3910),
-        "delhi": (28.6139, 77.2090),
-        "mumbai": (19.0760, 72.8777),
-        "bangalore": (12.9716, 77.5946),
-        "greater noida": (28.4744, 77.5040),
-        "ghaziabad": (28.6692, 77.4538),
-        "gurugram": (28.4595, 77.0266),
-        "pondicherry": (11.9416, 79.8083),
-
-        # Indian Forests and National Parks
-        "jim corbett national park": (29.5300, 78.7747),
-        "sundarbans": (21.9497, 89.1833),
-        "western ghats": (13.2969, 75.2479),
-        "kaziranga national park": (26.5880, 93.1700),
-        "ranthambore national park": (26.0173, 76.5026),
-        "bandipur national park": (11.6717, 76.6340),
-        "gir forest": (21.1200, 70.8200),
-
-        # Global Forests
-        "amazon rainforest": (-3.4653, -62.2159),
-        "borneo rainforest": (0.9619, 114.5548),
-        "congo rainforest": (-0.7264, 21.7279),
-        "daintree rainforest": (-16.2500, 145.4167),
-        "tongass national forest": (57.5051, -133.5001)
-    }
+    return get_gazetteer().to_dict()
 
-def get_location_suggestions(query: str) -> list:
+def get_location_suggestions(query: str, limit: int = 10) -> list:
     """
-    Get location suggestions based on user input
+    Get ranked, typo-tolerant location suggestions based on user input
     """
-    locations = get_predefined_locations()
-    query = query.lower()
+    matches = get_location_index().search(query, limit)
 
     # Direct match first
-    direct_matches = [loc.title() for loc in locations.keys() if query == loc.lower()]
-    if direct_matches:
-        return direct_matches
+    if matches and matches[0][1] == EXACT:
+        return [matches[0][0].title()]
 
-    # Then partial matches
-    return [loc.title() for loc in locations.keys() if query in loc.lower()]
+    return [name.title() for name, _ in matches]
 
 def generate_deforestation_data(location: str, start_year: int = 2000) -> pd.DataFrame:
     """
     Generate mock deforestation data for demonstration purposes
     """
-    # Generate yearly data from start_year to current year
-    current_year = datetime.now().year
-    years = list(range(start_year, current_year + 1))
-
-    # Generate synthetic forest cover data with realistic patterns
-    np.random.seed(hash(location) % 100)  # Consistent data for same location
-    
-    # Different initial covers based on location type
-    location_lower = location.lower()
-    if "rainforest" in location_lower:
-        initial_forest_cover = np.random.uniform(85, 95)
-    elif "national park" in location_lower:
-        initial_forest_cover = np.random.uniform(75, 85)
-    elif any(city in location_lower for city in ["noida", "delhi", "gurgaon", "ghaziabad", "greater noida"]):
-        initial_forest_cover = np.random.uniform(10, 20)  # Urban areas have much lower forest cover
-    else:
-        initial_forest_cover = np.random.uniform(30, 45)
-
-    forest_cover = []
-    deforestation_rate = []
-    
-    # Generate seasonal and yearly patterns
-    for i in range(len(years)):
-        # Base decline rate varies by location
-        base_decline = np.random.uniform(0.2, 0.8)
-        
-        # Add cyclical patterns
-        seasonal = 0.2 * np.sin(i * 2 * np.pi / 5)  # 5-year cycles
-        policy_impact = 0.3 * np.sin(i * 2 * np.pi / 10)  # 10-year policy cycles
-        
-        # Calculate year's decline with various factors
-        decline = max(0, base_decline + seasonal + policy_impact)
-        
-        if i == 0:
-            forest_cover.append(initial_forest_cover)
-        else:
-            # Add some recovery possibility
-            recovery = np.random.random() < 0.2  # 20% chance of slight recovery
-            if recovery:
-                change = np.random.uniform(0, decline/2)  # Partial recovery
-            else:
-                change = -decline
-            
-            new_cover = forest_cover[-1] + change
-            forest_cover.append(max(0, min(100, new_cover)))  # Keep within bounds
-        
-        deforestation_rate.append(abs(decline))
-
-    data = {
-        'year': years,
-        'forest_cover_percentage': forest_cover,
-        'deforestation_rate': deforestation_rate,
-        'total_area': [calculate_area(location)] * len(years),  # Dynamic area based on location
-        'location': [location] * len(years)
-    }
+    # Callers own the frame they get back, the cached one stays untouched
+    data = _generate_deforestation_data(location, start_year).copy()
+    data['location'] = location
+    return data
 
-    return pd.DataFrame(data)
+@memoize('series', max_entries=256, extra_key=lambda: datetime.now().year, locations=('location',))
+def _generate_deforestation_data(location: str, start_year: int) -> pd.DataFrame:
+    # Seeded from a stable digest of the location, so every process gets the same series
+    return batch_to_frame(simulate_deforestation([location], start_year))
 
+@memoize('coordinates', max_entries=1024, disk=False, locations=('location',))
 def get_location_coordinates(location: str) -> tuple:
     """
     Get coordinates for a location, using predefined coordinates for known locations
     """
-    locations = get_predefined_locations()
-    location_key = location.lower()
-
-    if location_key in locations:
-        return locations[location_key]
+    known = get_gazetteer().lookup(location)
+    if known is not None:
+        return known
 
     # For unknown locations, use their input name but generate consistent coordinates
     # This ensures same location gets same coordinates every time
-    np.random.seed(hash(location) % 100)
-    lat = np.random.uniform(-60, 60)  # Wider range for global coverage
-    lon = np.random.uniform(-180, 180)
-    return (lat, lon)
\ No newline at end of file
+    rng = location_rng(location, 'coordinates')
+    lat = rng.uniform(-60, 60)  # Wider range for global coverage
+    lon = rng.uniform(-180, 180)
+    return (lat, lon)
+
+def initial_cover_range(location: str) -> tuple:
+    """Return the (low, high) initial forest cover for a location type"""
+    location_lower = normalize_location(location)
+    if "rainforest" in location_lower:
+        return 85, 95
+    elif "national park" in location_lower:
+        return 75, 85
+    elif any(city in location_lower for city in URBAN_KEYWORDS):
+        return 10, 20  # Urban areas have much lower forest cover
+    else:
+        return 30, 45
+
+
+def area_range(location: str) -> tuple:
+    """Return the (low, high) area in hectares for a location type"""
+    location = normalize_location(location)
+    if 'forest' in location:
+        return 50000, 100000
+    elif any(x in location for x in ['city', 'town', 'urban']):
+        return 5000, 20000
+    else:
+        return 20000, 50000
+
+
+def simulate_forest_cover(initial_cover, base_decline, recovery_draw, recovery_fraction, step_offset: int = 0):
+    """Run the decline/recovery model for every series at once
+
+    All draws are (series, years) arrays; initial_cover has one value per series.
+    step_offset is the number of years since the series started, so a
+    continuation keeps the 5 and 10 year cycles in phase.
+    Returns (forest_cover, deforestation_rate) arrays of the same shape.
+    """
+    n_years = base_decline.shape[-1]
+    steps = np.arange(n_years) + step_offset
+
+    # Add cyclical patterns
+    seasonal = 0.2 * np.sin(steps * 2 * np.pi / 5)  # 5-year cycles
+    policy_impact = 0.3 * np.sin(steps * 2 * np.pi / 10)  # 10-year policy cycles
+    decline = np.maximum(0, base_decline + seasonal + policy_impact)
+
+    # 20% chance of slight, partial recovery instead of decline
+    change = np.where(recovery_draw < 0.2, recovery_fraction * decline / 2, -decline)
+
+    forest_cover = np.empty_like(decline)
+    forest_cover[..., 0] = initial_cover
+    for i in range(1, n_years):
+        # Keep within bounds
+        forest_cover[..., i] = np.clip(forest_cover[..., i - 1] + change[..., i], 0, 100)
+
+    return forest_cover, np.abs(decline)
+
+
+def simulate_deforestation(locations, start_year: int = 2000,
+                           seed: Optional[int] = None) -> DeforestationBatch:
+    """Generate mock deforestation series for many locations in one vectorized pass
+
+    Without a seed every location draws from its own stable stream, so a row is
+    identical to generate_deforestation_data for that location. A seed draws all
+    locations from one Generator instead, which is faster for very large batches.
+    """
+    locations = list(locations)
+    years = np.arange(start_year, datetime.now().year + 1)
+    shape = (len(locations), len(years))
+
+    cover_low, cover_high = np.array([initial_cover_range(loc) for loc in locations], dtype=float).reshape(-1, 2).T
+    area_low, area_high = np.array([area_range(loc) for loc in locations], dtype=float).reshape(-1, 2).T
+
+    if seed is None:
+        total_area = np.empty(shape[0])
+        initial_cover = np.empty(shape[0])
+        base_decline = np.empty(shape)
+        recovery_draw = np.empty(shape)
+        recovery_fraction = np.empty(shape)
+        for row, location in enumerate(locations):
+            rng = location_rng(location)
+            total_area[row] = rng.uniform(area_low[row], area_high[row])
+            initial_cover[row] = rng.uniform(cover_low[row], cover_high[row])
+            base_decline[row] = rng.uniform(0.2, 0.8, size=shape[1])
+            recovery_draw[row] = rng.random(shape[1])
+            recovery_fraction[row] = rng.random(shape[1])
+    else:
+        rng = np.random.default_rng(seed)
+        total_area = rng.uniform(area_low, area_high)
+        initial_cover = rng.uniform(cover_low, cover_high)
+        base_decline = rng.uniform(0.2, 0.8, size=shape)
+        recovery_draw = rng.random(shape)
+        recovery_fraction = rng.random(shape)
+
+    forest_cover, deforestation_rate = simulate_forest_cover(
+        initial_cover, base_decline, recovery_draw, recovery_fraction
+    )
+    return DeforestationBatch(locations, years, forest_cover, deforestation_rate, total_area)
+
+
+def batch_to_frame(batch: DeforestationBatch, output: str = 'pandas'):
+    """Flatten a batch into long format with one row per location and year
+
+    output is 'pandas' for a DataFrame or 'arrow' for a pyarrow Table with a
+    dictionary-encoded location column.
+    """
+    n_locations, n_years = batch.forest_cover.shape
+    columns = {
+        'year': np.tile(batch.years, n_locations),
+        'forest_cover_percentage': batch.forest_cover.ravel(),
+        'deforestation_rate': batch.deforestation_rate.ravel(),
+        'total_area': np.repeat(batch.total_area, n_years),
+    }
+
+    if output == 'arrow':
+        import pyarrow as pa
+
+        columns['location'] = pa.DictionaryArray.from_arrays(
+            np.repeat(np.arange(n_locations, dtype=np.int32), n_years),
+            pa.array(batch.locations, type=pa.string())
+        )
+        return pa.table(columns)
+    elif output == 'pandas':
+        columns['location'] = np.repeat(np.array(batch.locations, dtype=object), n_years)
+        return pd.DataFrame(columns)
+    raise ValueError(f"Unknown output format: {output}")
+
+
+def generate_deforestation_data_many(locations, start_year: int = 2000, seed: Optional[int] = None,
+                                     output: str = 'pandas'):
+    """
+    Generate mock deforestation data for many locations as one long-format table
+    """
+    return batch_to_frame(simulate_deforestation(locations, start_year, seed), output)
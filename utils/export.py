@@ -0,0 +1,281 @@
+import argparse
+import hashlib
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv
+import pyarrow.parquet as pq
+
+from .cache import memoize
+from .data_generator import SERIES_START_YEAR, generate_deforestation_data, generate_deforestation_data_many
+
+EXPORT_FORMATS = ('csv', 'parquet', 'arrow')
+MIME_TYPES = {
+    'csv': 'text/csv',
+    'parquet': 'application/vnd.apache.parquet',
+    'arrow': 'application/vnd.apache.arrow.file',
+}
+MANIFEST_NAME = '_manifest.json'
+
+
+def read_locations(path) -> List[str]:
+    """Read location names from a text file (one per line) or a CSV with a 'name' column"""
+    path = Path(path)
+    if path.suffix.lower() == '.csv':
+        return [name for name in pyarrow.csv.read_csv(path).column('name').to_pylist() if name]
+    with open(path, encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def series_table(locations, start_year: int = SERIES_START_YEAR) -> pa.Table:
+    """Generate the long-format series for a list of locations from start_year as a plain Arrow table
+
+    The series are generated from SERIES_START_YEAR and sliced, so the rows
+    match the app for every start year.
+    """
+    table = generate_deforestation_data_many(locations, SERIES_START_YEAR, output='arrow')
+    if start_year > SERIES_START_YEAR:
+        table = table.filter(pc.greater_equal(table.column('year'), start_year))
+    # CSV writers cannot encode dictionary columns
+    return table.set_column(
+        table.schema.get_field_index('location'), 'location',
+        table.column('location').cast(pa.string())
+    )
+
+
+def _write(table: pa.Table, sink, fmt: str):
+    if fmt == 'parquet':
+        pq.write_table(table, sink)
+    elif fmt == 'arrow':
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    else:
+        pyarrow.csv.write_csv(table, sink)
+
+
+def write_table(table: pa.Table, path: Path, fmt: str):
+    """Write a table atomically so readers never see a partial file"""
+    tmp_path = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+    _write(table, str(tmp_path), fmt)
+    os.replace(tmp_path, path)
+
+
+@memoize('exports', max_entries=32, disk=False, extra_key=lambda: datetime.now().year)
+def export_bytes(location: str, fmt: str = 'csv', start_year: Optional[int] = None,
+                 end_year: Optional[int] = None) -> bytes:
+    """Encode one location's series for a year range, built on first request and cached
+
+    Rows come from the float64 generator frame rather than the float32
+    ForestSeries, so they are identical to the CLI export. The range is
+    clamped like ForestSeries.to_frame.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    data = generate_deforestation_data(location)
+    years = data['year']
+    first, last = int(years.iloc[0]), int(years.iloc[-1])
+    start = first if start_year is None else min(max(int(start_year), first), last)
+    end = last if end_year is None else min(max(int(end_year), start), last)
+    data = data[(years >= start) & (years <= end)].reset_index(drop=True)
+    if fmt == 'csv':
+        # Same layout as the original pandas download
+        return data.to_csv(index=False).encode('utf-8')
+    sink = pa.BufferOutputStream()
+    _write(pa.Table.from_pandas(data, preserve_index=False), sink, fmt)
+    return sink.getvalue().to_pybytes()
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object that hands out what was written since the last drain"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def iter_export(locations, fmt: str = 'csv', chunk_size: int = 1000,
+                start_year: int = SERIES_START_YEAR) -> Iterator[bytes]:
+    """Yield a single CSV, Parquet or Arrow IPC file for many locations piece by piece
+
+    Locations are generated chunk_size at a time and each chunk is encoded and
+    yielded before the next is built, so memory stays bounded by one chunk
+    however many locations are exported.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    locations = list(locations)
+    sink = _ChunkSink()
+    writer = None
+    try:
+        for i in range(0, len(locations), chunk_size):
+            table = series_table(locations[i:i + chunk_size], start_year)
+            if fmt == 'csv':
+                # Only the first chunk carries the header
+                options = pyarrow.csv.WriteOptions(include_header=i == 0)
+                pyarrow.csv.write_csv(table, sink, write_options=options)
+            else:
+                if writer is None:
+                    writer = (pq.ParquetWriter(sink, table.schema) if fmt == 'parquet'
+                              else pa.ipc.new_file(sink, table.schema))
+                writer.write_table(table)
+            yield sink.drain()
+        if writer is not None:
+            writer.close()
+            writer = None
+            yield sink.drain()
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def export_file(locations, path, fmt: str = 'parquet', chunk_size: int = 1000, start_year: int = SERIES_START_YEAR,
+                progress=None) -> int:
+    """Stream many locations into one file, returning its size in bytes"""
+    path = Path(path)
+    tmp_path = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+    size = 0
+    with open(tmp_path, 'wb') as f:
+        for chunk in iter_export(locations, fmt, chunk_size, start_year):
+            f.write(chunk)
+            size += len(chunk)
+            if progress:
+                progress(size)
+    os.replace(tmp_path, path)
+    return size
+
+
+def part_path(output_dir: Path, chunk_id: int, fmt: str) -> Path:
+    return output_dir / f'part-{chunk_id:05d}.{fmt}'
+
+
+def export_chunk(locations, chunk_id: int, output_dir: str, fmt: str, start_year: int) -> tuple:
+    """Generate and write one chunk of locations, returning (chunk_id, rows)"""
+    table = series_table(locations, start_year)
+    write_table(table, part_path(Path(output_dir), chunk_id, fmt), fmt)
+    return chunk_id, table.num_rows
+
+
+def _manifest(locations, fmt: str, chunk_size: int, start_year: int) -> dict:
+    digest = hashlib.sha256('\n'.join(locations).encode('utf-8')).hexdigest()
+    return {
+        'locations': len(locations),
+        'locations_sha256': digest,
+        'format': fmt,
+        'chunk_size': chunk_size,
+        'start_year': start_year,
+        # Series end in the current year, parts from different years must not be mixed
+        'end_year': datetime.now().year,
+    }
+
+
+def export_series(locations, output_dir, fmt: str = 'parquet', chunk_size: int = 1000,
+                  workers=None, start_year: int = SERIES_START_YEAR, progress=None) -> int:
+    """Export series for many locations as part files, one per chunk, across a process pool
+
+    Finished chunks are skipped when the same export is run again, so an
+    interrupted job resumes where it stopped. Returns the number of rows written
+    by this run.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    locations = list(locations)
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    manifest = _manifest(locations, fmt, chunk_size, start_year)
+    manifest_path = output_dir / MANIFEST_NAME
+    if manifest_path.exists():
+        previous = json.loads(manifest_path.read_text())
+        if previous != manifest:
+            raise ValueError(f"{output_dir} holds a different export, choose another directory")
+    else:
+        manifest_path.write_text(json.dumps(manifest, indent=2))
+
+    success_path = output_dir / '_SUCCESS'
+    success_path.unlink(missing_ok=True)
+
+    chunks = [locations[i:i + chunk_size] for i in range(0, len(locations), chunk_size)]
+    pending = [i for i in range(len(chunks)) if not part_path(output_dir, i, fmt).exists()]
+    done = len(chunks) - len(pending)
+    rows = 0
+    if progress:
+        progress(done, len(chunks), rows)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(export_chunk, chunks[i], i, str(output_dir), fmt, start_year)
+            for i in pending
+        ]
+        for future in as_completed(futures):
+            _, chunk_rows = future.result()
+            done += 1
+            rows += chunk_rows
+            if progress:
+                progress(done, len(chunks), rows)
+
+    success_path.touch()
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Export deforestation series for many locations')
+    parser.add_argument('locations', help='text file with one location per line, or a CSV with a name column; '
+                                          "'gazetteer' exports every known location")
+    parser.add_argument('output_dir', help='directory for the part files, or the output file with --single-file')
+    parser.add_argument('--format', choices=EXPORT_FORMATS, default='parquet')
+    parser.add_argument('--chunk-size', type=int, default=1000, help='locations per part file')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: CPU count)')
+    parser.add_argument('--start-year', type=int, default=SERIES_START_YEAR)
+    parser.add_argument('--single-file', action='store_true',
+                        help='stream every location into one file instead of parallel part files')
+    args = parser.parse_args(argv)
+
+    if args.locations == 'gazetteer':
+        from .gazetteer import get_gazetteer
+
+        locations = get_gazetteer().names()
+    else:
+        locations = read_locations(args.locations)
+
+    started = time.perf_counter()
+
+    if args.single_file:
+        def report_bytes(size):
+            elapsed = time.perf_counter() - started
+            print(f"\r{size / 1e6:,.1f} MB written, {elapsed:.1f}s", end='', file=sys.stderr, flush=True)
+
+        size = export_file(locations, args.output_dir, args.format, args.chunk_size, args.start_year,
+                           progress=report_bytes)
+        print(f"\nExported {len(locations):,} locations ({size:,} bytes) to {args.output_dir}", file=sys.stderr)
+        return
+
+    def report(done, total, rows):
+        elapsed = time.perf_counter() - started
+        print(f"\r{done}/{total} chunks, {rows:,} rows written, {elapsed:.1f}s", end='', file=sys.stderr, flush=True)
+
+    try:
+        rows = export_series(locations, args.output_dir, args.format, args.chunk_size,
+                             args.workers, args.start_year, progress=report)
+    except ValueError as e:
+        parser.error(str(e))
+    print(f"\nExported {len(locations):,} locations ({rows:,} new rows) to {args.output_dir}", file=sys.stderr)
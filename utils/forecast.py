@@ -0,0 +1,56 @@
+import numpy as np
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+from .cache import memoize
+from .data_generator import simulate_forest_cover
+from .seeding import location_seed
+from .series import get_forest_series
+
+DEFAULT_PATHS = 10000
+DEFAULT_HORIZON = 30  # Years projected past the last observed year
+FORECAST_PERCENTILES = (5, 50, 95)
+
+
+class ForestForecast(NamedTuple):
+    """Percentile bands of simulated future forest cover, one value per year
+
+    The first year is the last observed one, so the bands start from the
+    historical series.
+    """
+    location: str
+    years: np.ndarray
+    p5: np.ndarray
+    p50: np.ndarray
+    p95: np.ndarray
+
+
+def simulate_paths(initial_cover: float, horizon: int, paths: int, rng: np.random.Generator,
+                   step_offset: int = 0) -> np.ndarray:
+    """Simulate (paths, horizon + 1) forest cover paths starting from initial_cover
+
+    Uses the same decline, recovery and cycle model as the historical series.
+    """
+    shape = (paths, horizon + 1)
+    base_decline = rng.uniform(0.2, 0.8, size=shape)
+    recovery_draw = rng.random(shape)
+    recovery_fraction = rng.random(shape)
+    forest_cover, _ = simulate_forest_cover(
+        np.full(paths, initial_cover), base_decline, recovery_draw, recovery_fraction, step_offset
+    )
+    return forest_cover
+
+
+@memoize('forecasts', max_entries=64, disk=False, extra_key=lambda: datetime.now().year,
+         locations=('location',))
+def forecast_forest_cover(location: str, horizon: int = DEFAULT_HORIZON, paths: int = DEFAULT_PATHS,
+                          seed: Optional[int] = None) -> ForestForecast:
+    """Project a location's forest cover with Monte Carlo paths and return p5/p50/p95 bands"""
+    series = get_forest_series(location)
+    rng = np.random.default_rng(seed if seed is not None else location_seed(location, 'forecast'))
+    cover = simulate_paths(
+        series.forest_cover_at(), horizon, paths, rng, step_offset=series.last_year - series.first_year
+    )
+    p5, p50, p95 = np.percentile(cover, FORECAST_PERCENTILES, axis=0)
+    years = np.arange(series.last_year, series.last_year + horizon + 1)
+    return ForestForecast(series.location, years, p5, p50, p95)
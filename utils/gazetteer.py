@@ -0,0 +1,189 @@
+import argparse
+import hashlib
+import os
+import threading
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.csv
+
+from .cache import DEFAULT_CACHE_DIR
+from .seeding import normalize_location
+
+GAZETTEER_CSV = Path(__file__).resolve().parent.parent / 'data' / 'gazetteer.csv'
+
+_gazetteer = None
+_gazetteer_lock = threading.Lock()
+
+
+def key_hash(key: str) -> int:
+    """Return the unsigned 64-bit hash used to index a normalized location name"""
+    return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def search_index_path(gazetteer_path) -> Path:
+    """Return where the location search index of a gazetteer file is kept"""
+    gazetteer_path = Path(gazetteer_path)
+    return gazetteer_path.with_name(f'{gazetteer_path.stem}.search.arrow')
+
+
+class StringView:
+    """Read-only sequence over an Arrow string array, decoding one value at a time from its buffers"""
+
+    def __init__(self, array: pa.Array):
+        _, offsets, data = array.buffers()
+        self._offsets = np.frombuffer(offsets, dtype=np.int32)[array.offset:array.offset + len(array) + 1]
+        self._data = memoryview(data if data is not None else b'')
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, row: int) -> str:
+        return str(self._data[self._offsets[row]:self._offsets[row + 1]], 'utf-8')
+
+
+def build_gazetteer(csv_path, output_path) -> int:
+    """Convert a name,lat,lon CSV into a memory-mappable Arrow file and return its row count
+
+    Optional country and region columns place each location in the region
+    hierarchy. Rows are sorted by the hash of their normalized name so lookups
+    can binary search the hash column without loading anything else. The
+    location search index is written next to it (see search_index_path).
+    """
+    # Imported here, search maps the files this module writes
+    from .search import write_location_index
+
+    source = pyarrow.csv.read_csv(csv_path, convert_options=pyarrow.csv.ConvertOptions(
+        column_types={'name': pa.string(), 'lat': pa.float64(), 'lon': pa.float64(),
+                      'country': pa.string(), 'region': pa.string()},
+        include_columns=['name', 'lat', 'lon', 'country', 'region'],
+        include_missing_columns=True
+    ))
+    keys = [normalize_location(name) for name in source.column('name').to_pylist()]
+    hashes = np.fromiter((key_hash(key) for key in keys), dtype=np.uint64, count=len(keys))
+    order = np.argsort(hashes, kind='stable')
+
+    table = pa.table({
+        'name': source.column('name').take(order),
+        'key': pa.array(keys, type=pa.string()).take(order),
+        'lat': source.column('lat').take(order),
+        'lon': source.column('lon').take(order),
+        'key_hash': pa.array(hashes[order], type=pa.uint64()),
+        'country': source.column('country').take(order),
+        'region': source.column('region').take(order),
+    }).combine_chunks()
+
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = output_path.with_name(f'{output_path.name}.{os.getpid()}.tmp')
+    with pa.OSFile(str(tmp_path), 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table, max_chunksize=max(len(table), 1))
+    os.replace(tmp_path, output_path)
+    # Written after the gazetteer, so an index newer than its gazetteer is current
+    write_location_index([keys[i] for i in order.tolist()], search_index_path(output_path))
+    return len(table)
+
+
+class Gazetteer:
+    """Read-only, memory-mapped table of location names and coordinates
+
+    Columns are zero-copy views of the mapped file, so opening it costs the same
+    for twenty rows or millions and only the pages touched by lookups are read.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._source = pa.memory_map(str(self.path), 'r')
+        self._table = pa.ipc.open_file(self._source).read_all()
+        self._hashes = self._column('key_hash').to_numpy(zero_copy_only=True)
+        self._lat = self._column('lat').to_numpy(zero_copy_only=True)
+        self._lon = self._column('lon').to_numpy(zero_copy_only=True)
+        self._keys = self._column('key')
+
+    def _column(self, name: str) -> pa.Array:
+        column = self._table.column(name)
+        if column.num_chunks == 1:
+            return column.chunk(0)
+        # Files written by build_gazetteer hold one batch, anything else is copied once
+        return pa.concat_arrays(column.chunks) if column.num_chunks else pa.array([], type=column.type)
+
+    def __len__(self):
+        return self._table.num_rows
+
+    def __contains__(self, location: str):
+        return self.lookup(location) is not None
+
+    def _row(self, location: str) -> Optional[int]:
+        key = normalize_location(location)
+        target = np.uint64(key_hash(key))
+        start = int(np.searchsorted(self._hashes, target, side='left'))
+        end = int(np.searchsorted(self._hashes, target, side='right'))
+        for row in range(start, end):
+            if self._keys[row].as_py() == key:
+                return row
+        return None
+
+    def lookup(self, location: str) -> Optional[Tuple[float, float]]:
+        """Return (lat, lon) for a location name, or None if it is not listed"""
+        row = self._row(location)
+        if row is None:
+            return None
+        return (float(self._lat[row]), float(self._lon[row]))
+
+    def names(self) -> List[str]:
+        """Display names of every location"""
+        return self._column('name').to_pylist()
+
+    def strings(self, column: str) -> StringView:
+        """Zero-copy view of a string column, such as 'name' or 'key', indexed by row"""
+        return StringView(self._column(column))
+
+    def hierarchy(self) -> List[Tuple[str, str, str]]:
+        """(country, region, name) of every location, 'Unknown' where a file has no such column"""
+        columns = []
+        for column in ('country', 'region'):
+            if column in self._table.column_names:
+                columns.append([value or 'Unknown' for value in self._column(column).to_pylist()])
+            else:
+                columns.append(['Unknown'] * len(self))
+        return list(zip(*columns, self.names()))
+
+    def to_dict(self) -> dict:
+        """Map normalized names to coordinates, only sensible for small gazetteers"""
+        return dict(zip(self._keys.to_pylist(), zip(self._lat.tolist(), self._lon.tolist())))
+
+
+def default_gazetteer_path() -> Path:
+    """Return the gazetteer file, building it from data/gazetteer.csv when missing or stale
+
+    Set FOREST_GAZETTEER to use a prebuilt file instead.
+    """
+    configured = os.environ.get('FOREST_GAZETTEER')
+    if configured:
+        return Path(configured)
+    path = DEFAULT_CACHE_DIR / 'gazetteer.arrow'
+    if not path.exists() or path.stat().st_mtime < GAZETTEER_CSV.stat().st_mtime:
+        build_gazetteer(GAZETTEER_CSV, path)
+    return path
+
+
+def get_gazetteer() -> Gazetteer:
+    """Return the process-wide gazetteer, opening it on first use"""
+    global _gazetteer
+    if _gazetteer is None:
+        with _gazetteer_lock:
+            if _gazetteer is None:
+                _gazetteer = Gazetteer(default_gazetteer_path())
+    return _gazetteer
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build a memory-mapped gazetteer from a name,lat,lon[,country,region] CSV')
+    parser.add_argument('csv_path', help='CSV file with name, lat and lon columns')
+    parser.add_argument('output_path', help='Arrow file to write')
+    args = parser.parse_args()
+    rows = build_gazetteer(args.csv_path, args.output_path)
+    print(f"Wrote {rows:,} locations to {args.output_path}")
@@ -0,0 +1,235 @@
+import os
+import pickle
+import select
+import subprocess
+import sys
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+PREFETCH_TOP_K = 3  # Suggestions warmed per query
+PREFETCH_WORKERS = int(os.environ.get('FOREST_TRACKER_PREFETCH_WORKERS', '1'))  # Per process, 0 disables
+MAX_QUEUED = 8  # Prefetches waiting for a worker before new ones are dropped
+SETTLE_TIMEOUT = 2  # Seconds a rerun waits for a running prefetch of its location before computing it
+CANCEL_POLL = 0.1  # Seconds between cancellation checks while a map builds
+ROOT = Path(__file__).resolve().parent.parent
+
+_prefetcher = None
+_prefetcher_lock = threading.Lock()
+
+
+class PrefetchCancelled(Exception):
+    """Raised inside a prefetch whose query is no longer shown"""
+
+
+class MapBuilder:
+    """Helper process that builds map HTML at the lowest CPU priority
+
+    A marker map is seconds of pure Python. Built on a thread it would hold
+    the GIL against the foreground reruns of every session in the process,
+    so it is built in a separate process that the OS schedules behind them.
+    A cancelled build kills the process, the next build starts a new one.
+    """
+
+    def __init__(self):
+        self._process = None
+
+    def _start(self):
+        self._process = subprocess.Popen(
+            [sys.executable, '-m', 'utils.prefetch'],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, cwd=str(ROOT)
+        )
+
+    def close(self):
+        if self._process is not None:
+            self._process.kill()
+            self._process.wait()
+            self._process = None
+
+    def build(self, args: tuple, cancelled: Optional[threading.Event] = None) -> str:
+        """Return _build_map_html(*args) built in the helper process"""
+        if self._process is None or self._process.poll() is not None:
+            self._start()
+        payload = pickle.dumps(args, protocol=pickle.HIGHEST_PROTOCOL)
+        self._process.stdin.write(len(payload).to_bytes(8, 'little') + payload)
+        self._process.stdin.flush()
+
+        stdout = self._process.stdout
+        while not select.select([stdout], [], [], CANCEL_POLL)[0]:
+            if cancelled is not None and cancelled.is_set():
+                self.close()
+                raise PrefetchCancelled(args[0])
+        header = stdout.read(8)
+        if len(header) < 8:
+            self.close()
+            raise RuntimeError("Map builder process exited")
+        ok, value = pickle.loads(stdout.read(int.from_bytes(header, 'little')))
+        if not ok:
+            raise value
+        return value
+
+
+def _serve_map_builds():
+    """Helper process loop: read pickled map arguments from stdin, answer with the HTML"""
+    if hasattr(os, 'nice'):
+        os.nice(19)
+    # Replies own the real stdout, anything a library prints goes to stderr
+    replies = os.fdopen(os.dup(1), 'wb')
+    os.dup2(2, 1)
+    requests = sys.stdin.buffer
+
+    from .visualization import _build_map_html
+
+    while True:
+        header = requests.read(8)
+        if len(header) < 8:
+            return
+        args = pickle.loads(requests.read(int.from_bytes(header, 'little')))
+        try:
+            # Unmemoized, the server process keeps the result
+            reply = (True, _build_map_html.__wrapped__(*args))
+        except Exception as e:
+            reply = (False, e)
+        payload = pickle.dumps(reply, protocol=pickle.HIGHEST_PROTOCOL)
+        replies.write(len(payload).to_bytes(8, 'little') + payload)
+        replies.flush()
+
+
+def warm_location(location: str, cancelled: Optional[threading.Event] = None,
+                  map_builder: Optional[MapBuilder] = None):
+    """Fill the caches a first render of location reads, stopping between steps once cancelled
+
+    The map is built in map_builder's process when one is given, otherwise here.
+    """
+    from .data_generator import get_location_coordinates
+    from .raster import get_forest_raster
+    from .series import get_forest_series
+    from .visualization import _build_map_html, map_build_args
+
+    def check():
+        if cancelled is not None and cancelled.is_set():
+            raise PrefetchCancelled(location)
+
+    check()
+    current_cover = get_forest_series(location).forest_cover_at()
+    check()
+    coordinates = get_location_coordinates(location)
+    check()
+    get_forest_raster(location)
+    check()
+    # The map tab opens on the first render mode, the slowest step
+    args = map_build_args(location, coordinates, current_cover)
+    if map_builder is None:
+        _build_map_html(*args)
+    elif _build_map_html.lookup(*args) is None:
+        _build_map_html.store(map_builder.build(args, cancelled), *args)
+
+
+class PrefetchBatch:
+    """Prefetches started for one query, cancelled together when the query changes"""
+
+    def __init__(self, query: str):
+        self.query = query
+        self.futures: Dict[str, Future] = {}
+        self._cancelled: Dict[str, threading.Event] = {}
+
+    def cancel(self, keep: Iterable[str] = ()):
+        """Drop queued prefetches and stop running ones, except those for locations in keep"""
+        keep = set(keep)
+        for location, future in self.futures.items():
+            if location not in keep:
+                future.cancel()
+                self._cancelled[location].set()
+
+    def settle(self, location: str, timeout: float = SETTLE_TIMEOUT):
+        """Cancel the other suggestions and wait for a running prefetch of location
+
+        Waiting means the rerun does not compute the location twice. A prefetch
+        still queued behind others is cancelled instead, computing it in the
+        rerun is quicker. So is one that does not finish within timeout: under
+        load the low-priority map build is starved by the foreground reruns,
+        so it is stopped and the rerun builds the map at normal priority.
+        """
+        self.cancel(keep=(location,))
+        future = self.futures.get(location)
+        if future is None or future.cancel():
+            return
+        try:
+            future.result(timeout=timeout)
+        except Exception:
+            # Cancelled, slow or failed, the rerun computes whatever is missing itself
+            self.cancel()
+
+
+class Prefetcher:
+    """Bounded thread pool that warms caches for locations a user is likely to open next
+
+    The pool size caps prefetch concurrency for the whole process, and once
+    MAX_QUEUED prefetches are waiting new ones are dropped, so typing quickly
+    cannot build a backlog. Each worker thread builds maps through its own
+    low-priority MapBuilder process, the thread itself only runs the cheap
+    steps. Prefetching is best effort: failures are left for the foreground
+    render to report.
+    """
+
+    def __init__(self, workers: int = PREFETCH_WORKERS, max_queued: int = MAX_QUEUED):
+        self.workers = workers
+        self.max_queued = max_queued
+        self._executor = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._queued = 0
+        self.submitted = 0
+        self.dropped = 0
+
+    def _run(self, location: str, cancelled: threading.Event):
+        with self._lock:
+            self._queued -= 1
+        if not hasattr(self._local, 'map_builder'):
+            self._local.map_builder = MapBuilder()
+        warm_location(location, cancelled, self._local.map_builder)
+
+    def _discard(self, future: Future):
+        if future.cancelled():
+            with self._lock:
+                self._queued -= 1
+
+    def submit(self, query: str, locations: Iterable[str]) -> PrefetchBatch:
+        """Warm locations in the background and return their batch, which may be empty when disabled or full"""
+        batch = PrefetchBatch(query)
+        if self.workers <= 0:
+            return batch
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='forest-prefetch')
+            for location in dict.fromkeys(locations):
+                if self._queued >= self.max_queued:
+                    self.dropped += 1
+                    continue
+                self._queued += 1
+                self.submitted += 1
+                cancelled = batch._cancelled[location] = threading.Event()
+                future = self._executor.submit(self._run, location, cancelled)
+                future.add_done_callback(self._discard)
+                batch.futures[location] = future
+        return batch
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'workers': self.workers, 'queued': self._queued,
+                    'submitted': self.submitted, 'dropped': self.dropped}
+
+
+def get_prefetcher() -> Prefetcher:
+    """Return the process-wide prefetcher shared by every session"""
+    global _prefetcher
+    if _prefetcher is None:
+        with _prefetcher_lock:
+            if _prefetcher is None:
+                _prefetcher = Prefetcher()
+    return _prefetcher
+
+
+if __name__ == '__main__':
+    _serve_map_builds()
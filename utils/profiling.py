@@ -0,0 +1,139 @@
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+import numpy as np
+
+ROLLING_WINDOW = 200  # Reruns kept per stage for the rolling percentiles
+PERF_LOG_PATH = os.environ.get('FOREST_TRACKER_PERF_LOG')
+DEBUG_ENABLED = os.environ.get('FOREST_TRACKER_DEBUG', '0') == '1'
+
+logger = logging.getLogger('forest_tracker.perf')
+if PERF_LOG_PATH:
+    _handler = logging.FileHandler(PERF_LOG_PATH)
+    _handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+
+_history = defaultdict(lambda: deque(maxlen=ROLLING_WINDOW))
+_history_lock = threading.Lock()
+
+
+def payload_size(value) -> int:
+    """Approximate bytes a value contributes to the page"""
+    if isinstance(value, (bytes, str)):
+        return len(value)
+    if hasattr(value, 'to_plotly_json'):
+        return len(value.to_json())
+    if hasattr(value, 'memory_usage'):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    return 0
+
+
+class _Stage:
+    __slots__ = ('size',)
+
+    def __init__(self):
+        self.size = None
+
+    def set_payload(self, value):
+        """Record the payload size of a stage's output"""
+        self.size = payload_size(value)
+
+
+class _NullStage:
+    __slots__ = ()
+
+    def set_payload(self, value):
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+class RerunTimer:
+    """Time the stages of one script rerun
+
+    When disabled, stage() only yields a shared no-op handle, so instrumented
+    code pays for little more than a context manager.
+    """
+
+    def __init__(self, enabled: bool = False, **context):
+        self.enabled = enabled or bool(PERF_LOG_PATH)
+        self.rerun_id = uuid.uuid4().hex[:12] if self.enabled else None
+        self.context = context
+        self.records = []
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str):
+        if not self.enabled:
+            yield _NULL_STAGE
+            return
+        handle = _Stage()
+        start = time.perf_counter()
+        try:
+            yield handle
+        finally:
+            self.record(name, time.perf_counter() - start, handle.size)
+
+    def record(self, name: str, seconds: float, size=None):
+        """Store one stage duration and emit it as a JSON line"""
+        entry = {'rerun': self.rerun_id, 'stage': name, 'ms': round(seconds * 1000, 3)}
+        if size is not None:
+            entry['bytes'] = size
+        entry.update(self.context)
+        self.records.append(entry)
+        with _history_lock:
+            _history[name].append(seconds)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps(entry, default=str))
+
+    def finish(self):
+        """Record the total rerun time, once all stages have run"""
+        if self.enabled:
+            self.record('total', time.perf_counter() - self._started)
+
+
+def rolling_percentiles() -> dict:
+    """Return {stage: (count, p50 ms, p95 ms)} over recent reruns in this process"""
+    with _history_lock:
+        snapshot = {name: np.array(values) for name, values in _history.items() if values}
+    return {
+        name: (len(values), *(np.percentile(values, [50, 95]) * 1000))
+        for name, values in snapshot.items()
+    }
+
+
+def render_performance_panel(timer: RerunTimer, container=None):
+    """Show the per-stage breakdown of this rerun and rolling percentiles, in the sidebar by default"""
+    import pandas as pd
+    import streamlit as st
+
+    from .cache import cache_stats
+
+    if container is None:
+        container = st.sidebar.expander("⏱️ Performance", expanded=True)
+    with container:
+        st.markdown("**This rerun**")
+        st.dataframe(
+            pd.DataFrame(timer.records, columns=['stage', 'ms', 'bytes']),
+            hide_index=True,
+            use_container_width=True
+        )
+        st.markdown("**Rolling (this process)**")
+        st.dataframe(
+            pd.DataFrame(
+                [(name, *stats) for name, stats in rolling_percentiles().items()],
+                columns=['stage', 'runs', 'p50 ms', 'p95 ms']
+            ).round(2),
+            hide_index=True,
+            use_container_width=True
+        )
+        st.markdown("**Caches**")
+        st.dataframe(pd.DataFrame(cache_stats()).T, use_container_width=True)
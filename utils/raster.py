@@ -0,0 +1,240 @@
+import numpy as np
+from datetime import datetime
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+from .cache import memoize
+from .density import (
+    DEFAULT_RADIUS,
+    METERS_PER_DEGREE,
+    compute_density_field,
+    cover_to_rgba
+)
+from .seeding import location_seed
+
+RASTER_NUM_POINTS = 100  # Finest level has 2 * num_points + 1 cells per side
+MAX_LEVELS = 6
+MIN_ZONE_CELLS = 400  # Automatic level choice keeps at least this many cells in a zone
+DENSE_COVER = 50  # Cover percentage counted as dense forest
+HISTOGRAM_BINS = np.linspace(0, 100, 11)
+
+
+class ZonalStats(NamedTuple):
+    """Forest cover summary of the land cells inside a zone"""
+    mean_cover: float  # Area weighted mean cover percentage
+    area_ha: float  # Land area of the zone
+    dense_area_ha: float  # Land area with cover above the threshold
+    dense_fraction: float  # dense_area_ha / area_ha
+    histogram_ha: np.ndarray  # Land area per HISTOGRAM_BINS interval
+    level: int  # Pyramid level the statistics were computed on
+
+
+class RasterLevel(NamedTuple):
+    """One resolution of the pyramid
+
+    cover is the mean cover of each cell's land (NaN for sea) and land_cells
+    counts the finest-level land cells it aggregates, so sums stay exact at
+    every level. bin_cells and dense_cells count those finest-level cells per
+    HISTOGRAM_BINS interval and above DENSE_COVER, since neither can be
+    recovered from the mean; level 0 leaves them None and uses cover.
+    """
+    lat: np.ndarray  # (rows,) cell center latitudes, south to north
+    lon: np.ndarray  # (cols,) cell center longitudes, west to east
+    cover: np.ndarray  # (rows, cols) float32
+    land_cells: np.ndarray  # (rows, cols) uint16
+    bin_cells: Optional[np.ndarray] = None  # (rows, cols, bins) uint16
+    dense_cells: Optional[np.ndarray] = None  # (rows, cols) uint16
+
+
+def _halve_axis(axis: np.ndarray) -> np.ndarray:
+    if len(axis) % 2:
+        axis = np.append(axis, 2 * axis[-1] - axis[-2])
+    return axis.reshape(-1, 2).mean(axis=1)
+
+
+def _cell_counts(level: RasterLevel):
+    """Return a level's finest-level land cells per histogram bin and above DENSE_COVER"""
+    if level.bin_cells is not None:
+        return level.bin_cells, level.dense_cells
+    # Level 0, every land cell counts once in the bin of its own cover
+    land = level.land_cells > 0
+    cover = np.nan_to_num(level.cover)
+    bins = np.digitize(cover, HISTOGRAM_BINS[1:-1])
+    bin_cells = (bins[..., None] == np.arange(len(HISTOGRAM_BINS) - 1)) & land[..., None]
+    return bin_cells.astype(np.uint16), (land & (cover > DENSE_COVER)).astype(np.uint16)
+
+
+def _sum_blocks(values: np.ndarray) -> np.ndarray:
+    """Sum 2x2 blocks over the first two axes, padding odd sizes with zeros"""
+    rows, cols = values.shape[:2]
+    pad = ((0, rows % 2), (0, cols % 2)) + ((0, 0),) * (values.ndim - 2)
+    values = np.pad(values, pad)
+    shape = (values.shape[0] // 2, 2, values.shape[1] // 2, 2) + values.shape[2:]
+    return values.reshape(shape).sum(axis=(1, 3))
+
+
+def _halve_level(level: RasterLevel) -> RasterLevel:
+    """Merge 2x2 blocks of cells, weighting each by its land cells"""
+    bin_cells, dense_cells = _cell_counts(level)
+    land_cells = _sum_blocks(level.land_cells.astype(np.float64))
+    totals = _sum_blocks(np.nan_to_num(level.cover) * level.land_cells)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cover = np.where(land_cells > 0, totals / land_cells, np.nan)
+    return RasterLevel(_halve_axis(level.lat), _halve_axis(level.lon),
+                       cover.astype(np.float32), land_cells.astype(np.uint16),
+                       _sum_blocks(bin_cells).astype(np.uint16), _sum_blocks(dense_cells).astype(np.uint16))
+
+
+class ForestRaster:
+    """Forest cover around a location as a float32 grid with a resolution pyramid
+
+    Level 0 is the density field drawn on the map; every further level halves
+    the resolution. Zonal statistics are whole-array operations on the level
+    that keeps enough cells inside the zone.
+    """
+
+    def __init__(self, location: str, coordinates, cell_size: float, lat_grid: np.ndarray,
+                 lon_grid: np.ndarray, cover: np.ndarray, land: np.ndarray):
+        self.location = location
+        self.coordinates = (float(coordinates[0]), float(coordinates[1]))
+        self.cell_size = float(cell_size)  # Meters per side of a level 0 cell
+        self.cell_area_ha = self.cell_size ** 2 / 10000
+        base = RasterLevel(
+            lat_grid[:, 0].copy(),
+            lon_grid[0, :].copy(),
+            np.where(land, cover, np.nan).astype(np.float32),
+            land.astype(np.uint16)
+        )
+        self.levels: List[RasterLevel] = [base]
+        while len(self.levels) < MAX_LEVELS and min(self.levels[-1].cover.shape) > 2:
+            self.levels.append(_halve_level(self.levels[-1]))
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.levels[0].cover.shape
+
+    def bounds(self):
+        """Return [[south, west], [north, east]] covering every level 0 cell"""
+        base = self.levels[0]
+        half_lat = (base.lat[1] - base.lat[0]) / 2
+        half_lon = (base.lon[1] - base.lon[0]) / 2
+        return [
+            [float(base.lat[0] - half_lat), float(base.lon[0] - half_lon)],
+            [float(base.lat[-1] + half_lat), float(base.lon[-1] + half_lon)]
+        ]
+
+    def to_rgba(self) -> np.ndarray:
+        """Color level 0 like the forest markers, row 0 is the southern edge"""
+        base = self.levels[0]
+        point_lat, point_lon = np.meshgrid(base.lat, base.lon, indexing='ij')
+        land = base.land_cells > 0
+        return cover_to_rgba(point_lat, point_lon, np.nan_to_num(base.cover), land)
+
+    def circle_mask(self, radius: float, center=None, level: int = 0) -> np.ndarray:
+        """Cells of a level whose centers lie within radius meters of center (the location by default)"""
+        lat, lon = center if center is not None else self.coordinates
+        cells = self.levels[level]
+        dy = (cells.lat - lat) * METERS_PER_DEGREE
+        dx = (cells.lon - lon) * METERS_PER_DEGREE * np.cos(np.radians(lat))
+        return dy[:, None] ** 2 + dx[None, :] ** 2 <= radius ** 2
+
+    def polygon_mask(self, vertices: Sequence[Tuple[float, float]], level: int = 0) -> np.ndarray:
+        """Cells of a level whose centers lie inside a (lat, lon) polygon, by the even-odd rule"""
+        cells = self.levels[level]
+        point_lat = cells.lat[:, None]
+        point_lon = cells.lon[None, :]
+        inside = np.zeros((len(cells.lat), len(cells.lon)), dtype=bool)
+        vertices = np.asarray(vertices, dtype=float)
+        for (lat1, lon1), (lat2, lon2) in zip(vertices, np.roll(vertices, -1, axis=0)):
+            if lat1 == lat2:
+                continue
+            # Edges crossing the cell's latitude to the east of it flip the cell
+            crosses = (lat1 > point_lat) != (lat2 > point_lat)
+            edge_lon = lon1 + (point_lat - lat1) * (lon2 - lon1) / (lat2 - lat1)
+            inside ^= crosses & (point_lon < edge_lon)
+        return inside
+
+    def level_zero_mask(self, mask: np.ndarray, level: int) -> np.ndarray:
+        """Expand a mask of a level to the level 0 cells its cells aggregate"""
+        rows, cols = self.shape
+        return mask[(np.arange(rows) >> level)[:, None], (np.arange(cols) >> level)[None, :]]
+
+    def zonal_stats(self, mask: np.ndarray, level: int = 0, threshold: float = DENSE_COVER) -> ZonalStats:
+        """Summarize the land cells selected by a boolean mask of a level
+
+        The mean, histogram and dense area equal those of the level 0 cells the
+        selected cells aggregate; a threshold other than DENSE_COVER is counted
+        on level 0.
+        """
+        cells = self.levels[level]
+        weight = cells.land_cells[mask].astype(np.float64)
+        cover = np.nan_to_num(cells.cover[mask]).astype(np.float64)
+        land_cells = weight.sum()
+        area_ha = land_cells * self.cell_area_ha
+        if cells.bin_cells is None:
+            histogram = np.histogram(cover, bins=HISTOGRAM_BINS, weights=weight)[0] * self.cell_area_ha
+        else:
+            histogram = cells.bin_cells[mask].sum(axis=0) * self.cell_area_ha
+        if not land_cells:
+            return ZonalStats(0.0, 0.0, 0.0, 0.0, histogram, level)
+        if cells.dense_cells is not None and threshold == DENSE_COVER:
+            dense_cells = cells.dense_cells[mask].sum()
+        else:
+            base = self.levels[0]
+            selected = self.level_zero_mask(mask, level) & (base.land_cells > 0)
+            dense_cells = np.count_nonzero(selected & (np.nan_to_num(base.cover) > threshold))
+        dense = dense_cells * self.cell_area_ha
+        return ZonalStats(
+            float(np.dot(cover, weight) / land_cells),
+            float(area_ha),
+            float(dense),
+            float(dense / area_ha),
+            histogram,
+            level
+        )
+
+    def auto_level(self, zone_cells: int) -> int:
+        """Coarsest level still holding MIN_ZONE_CELLS cells of a zone that covers zone_cells at level 0"""
+        level = 0
+        while level + 1 < len(self.levels) and zone_cells / 4 ** (level + 1) >= MIN_ZONE_CELLS:
+            level += 1
+        return level
+
+    def circle_stats(self, radius: float = DEFAULT_RADIUS, center=None, level: Optional[int] = None,
+                     threshold: float = DENSE_COVER) -> ZonalStats:
+        """Statistics of a circle of radius meters, on the coarsest adequate level unless one is given"""
+        if level is None:
+            level = self.auto_level(int(np.pi * (radius / self.cell_size) ** 2))
+        return self.zonal_stats(self.circle_mask(radius, center, level), level, threshold)
+
+    def polygon_stats(self, vertices: Sequence[Tuple[float, float]], level: Optional[int] = None,
+                      threshold: float = DENSE_COVER) -> ZonalStats:
+        """Statistics of a (lat, lon) polygon, on the coarsest adequate level unless one is given"""
+        if level is None:
+            level = self.auto_level(int(self.polygon_mask(vertices, 0).sum()))
+        return self.zonal_stats(self.polygon_mask(vertices, level), level, threshold)
+
+
+@memoize('rasters', max_entries=64, disk=False, locations=('location',))
+def build_forest_raster(location: str, coordinates: Tuple[float, float], forest_cover: float,
+                        num_points: int = RASTER_NUM_POINTS, seed: Optional[int] = None,
+                        radius: float = DEFAULT_RADIUS) -> ForestRaster:
+    """Sample the density model into a ForestRaster, cached per location and parameters
+
+    Uses the same random stream as the map, so the raster and the map overlay
+    show the same field.
+    """
+    rng = np.random.default_rng(seed if seed is not None else location_seed(location, 'map'))
+    field = compute_density_field(location, coordinates, forest_cover, radius, num_points, rng)
+    return ForestRaster(location, coordinates, radius / num_points, field.lat, field.lon, field.cover, field.land)
+
+
+@memoize('location_rasters', max_entries=64, disk=False, extra_key=lambda: datetime.now().year,
+         locations=('location',))
+def get_forest_raster(location: str) -> ForestRaster:
+    """Return the raster for a location at its current forest cover"""
+    from .data_generator import get_location_coordinates
+    from .series import get_forest_series
+
+    coordinates = get_location_coordinates(location)
+    coordinates = (float(coordinates[0]), float(coordinates[1]))
+    return build_forest_raster(location, coordinates, get_forest_series(location).forest_cover_at())
@@ -0,0 +1,204 @@
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .cache import memoize
+from .data_generator import URBAN_KEYWORDS, simulate_deforestation
+from .seeding import normalize_location
+
+Path = Tuple[str, ...]
+
+
+def site_type(location: str) -> str:
+    """Group a location by the same keywords the generator uses for its cover range"""
+    location_lower = normalize_location(location)
+    if "rainforest" in location_lower:
+        return 'Rainforest'
+    elif "national park" in location_lower:
+        return 'National Park'
+    elif any(city in location_lower for city in URBAN_KEYWORDS):
+        return 'Urban'
+    return 'Other'
+
+
+class RegionRollups:
+    """Area-weighted forest aggregates for every node of a site hierarchy
+
+    Each site has a path such as (country, region, site); every prefix of a
+    path is a node and the empty path is the root. Nodes keep prefix sums over
+    the years of forested hectares and area-weighted deforestation rate, so
+    any node answers a year-range query in O(1). Updating a site adds its
+    difference to its ancestors only.
+    """
+
+    def __init__(self, years, paths: Sequence[Path], total_area, forest_cover, deforestation_rate):
+        self.years = np.asarray(years)
+        self.first_year = int(self.years[0])
+        self.last_year = int(self.years[-1])
+
+        self.nodes: Dict[Path, int] = {(): 0}
+        self._children: Dict[Path, List[Path]] = {(): []}
+        self._site_rows: Dict[Path, int] = {}
+        ancestors = []
+        for row, path in enumerate(map(tuple, paths)):
+            if path in self._site_rows:
+                raise ValueError(f"Duplicate site path: {path}")
+            self._site_rows[path] = row
+            chain = [0]
+            for depth in range(1, len(path) + 1):
+                node = path[:depth]
+                if node not in self.nodes:
+                    self.nodes[node] = len(self.nodes)
+                    self._children[node] = []
+                    self._children[node[:-1]].append(node)
+                chain.append(self.nodes[node])
+            ancestors.append(chain)
+        self._ancestors = ancestors
+
+        # Site contributions, kept so an update can subtract them again
+        self._site_area = np.asarray(total_area, dtype=float).copy()
+        self._site_forest = self._site_area[:, None] * np.asarray(forest_cover, dtype=float) / 100
+        self._site_rate = self._site_area[:, None] * np.asarray(deforestation_rate, dtype=float)
+
+        n_years = len(self.years)
+        self._area = np.zeros(len(self.nodes))
+        self._site_count = np.zeros(len(self.nodes), dtype=np.int64)
+        self._forest_prefix = np.zeros((len(self.nodes), n_years + 1))
+        self._rate_prefix = np.zeros((len(self.nodes), n_years + 1))
+        forest_cumsum = np.cumsum(self._site_forest, axis=1)
+        rate_cumsum = np.cumsum(self._site_rate, axis=1)
+
+        # One scatter-add per depth keeps memory at a single (sites, years) array
+        for depth in range(max((len(chain) for chain in ancestors), default=0)):
+            sites = np.array([row for row, chain in enumerate(ancestors) if len(chain) > depth], dtype=int)
+            nodes = np.array([ancestors[row][depth] for row in sites], dtype=int)
+            np.add.at(self._area, nodes, self._site_area[sites])
+            np.add.at(self._site_count, nodes, 1)
+            np.add.at(self._forest_prefix[:, 1:], nodes, forest_cumsum[sites])
+            np.add.at(self._rate_prefix[:, 1:], nodes, rate_cumsum[sites])
+
+    def __len__(self):
+        return len(self._site_rows)
+
+    def _node(self, path: Path) -> int:
+        try:
+            return self.nodes[tuple(path)]
+        except KeyError:
+            raise KeyError(f"Unknown region: {' / '.join(path)}") from None
+
+    def _bounds(self, start_year: Optional[int], end_year: Optional[int]):
+        """Return clamped [start, end] year indices for a year range"""
+        last = len(self.years) - 1
+        start = 0 if start_year is None else int(start_year) - self.first_year
+        end = last if end_year is None else int(end_year) - self.first_year
+        start = min(max(start, 0), last)
+        end = min(max(end, start), last)
+        return start, end
+
+    def _forest_ha(self, node: int, index: int) -> float:
+        return self._forest_prefix[node, index + 1] - self._forest_prefix[node, index]
+
+    def children(self, path: Path = ()) -> List[Path]:
+        """Direct children of a node, the root's children by default"""
+        self._node(path)
+        return list(self._children[tuple(path)])
+
+    def at_depth(self, depth: int) -> List[Path]:
+        """Every node whose path has depth elements"""
+        return [path for path in self.nodes if len(path) == depth]
+
+    def area(self, path: Path = ()) -> float:
+        """Total area in hectares of the sites under a node"""
+        return float(self._area[self._node(path)])
+
+    def forest_cover(self, path: Path = (), year: Optional[int] = None) -> float:
+        """Area-weighted forest cover percentage of a node in a year, the latest by default"""
+        node = self._node(path)
+        _, end = self._bounds(year, year)
+        return float(100 * self._forest_ha(node, end) / self._area[node]) if self._area[node] else 0.0
+
+    def mean_cover(self, path: Path = (), start_year: Optional[int] = None,
+                   end_year: Optional[int] = None) -> float:
+        """Area-weighted forest cover percentage averaged over a year range"""
+        node = self._node(path)
+        start, end = self._bounds(start_year, end_year)
+        if not self._area[node]:
+            return 0.0
+        forest = self._forest_prefix[node, end + 1] - self._forest_prefix[node, start]
+        return float(100 * forest / (end - start + 1) / self._area[node])
+
+    def forest_loss(self, path: Path = (), start_year: Optional[int] = None,
+                    end_year: Optional[int] = None) -> float:
+        """Hectares of forest lost between the first and last year of the range"""
+        node = self._node(path)
+        start, end = self._bounds(start_year, end_year)
+        return float(self._forest_ha(node, start) - self._forest_ha(node, end))
+
+    def mean_rate(self, path: Path = (), start_year: Optional[int] = None,
+                  end_year: Optional[int] = None) -> float:
+        """Area-weighted mean annual deforestation rate over a year range"""
+        node = self._node(path)
+        start, end = self._bounds(start_year, end_year)
+        if not self._area[node]:
+            return 0.0
+        total = self._rate_prefix[node, end + 1] - self._rate_prefix[node, start]
+        return float(total / (end - start + 1) / self._area[node])
+
+    def update_site(self, path: Path, forest_cover, deforestation_rate, total_area: float):
+        """Replace one site's series, refreshing only the nodes above it"""
+        path = tuple(path)
+        if path not in self._site_rows:
+            raise KeyError(f"Unknown site: {' / '.join(path)}")
+        row = self._site_rows[path]
+        forest = total_area * np.asarray(forest_cover, dtype=float) / 100
+        rate = total_area * np.asarray(deforestation_rate, dtype=float)
+
+        chain = self._ancestors[row]
+        self._area[chain] += total_area - self._site_area[row]
+        self._forest_prefix[chain, 1:] += np.cumsum(forest - self._site_forest[row])
+        self._rate_prefix[chain, 1:] += np.cumsum(rate - self._site_rate[row])
+        self._site_area[row] = total_area
+        self._site_forest[row] = forest
+        self._site_rate[row] = rate
+
+    def summary(self, depth: int = 1, start_year: Optional[int] = None,
+                end_year: Optional[int] = None) -> pd.DataFrame:
+        """One row per node at a depth with its area, sites, cover and loss over a year range"""
+        start, end = self._bounds(start_year, end_year)
+        paths = self.at_depth(depth)
+        rows = np.array([self.nodes[path] for path in paths], dtype=int)
+        area = self._area[rows]
+        forest_start = self._forest_prefix[rows, start + 1] - self._forest_prefix[rows, start]
+        forest_end = self._forest_prefix[rows, end + 1] - self._forest_prefix[rows, end]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            cover = np.where(area > 0, 100 * forest_end / area, 0.0)
+        return pd.DataFrame({
+            'region': [' / '.join(path) for path in paths],
+            'sites': self._site_count[rows],
+            'total_area': area,
+            'forest_cover_percentage': cover,
+            'forest_loss_ha': forest_start - forest_end,
+        })
+
+
+def build_rollups(paths: Sequence[Path], start_year: int = 2000) -> RegionRollups:
+    """Simulate every site (the last element of each path) and aggregate it up its path"""
+    paths = [tuple(path) for path in paths]
+    batch = simulate_deforestation([path[-1] for path in paths], start_year)
+    return RegionRollups(batch.years, paths, batch.total_area, batch.forest_cover, batch.deforestation_rate)
+
+
+@memoize('rollups', max_entries=8, disk=False, extra_key=lambda: datetime.now().year)
+def get_region_rollups(grouping: str = 'region', start_year: int = 2000) -> RegionRollups:
+    """Rollups of every gazetteer location by 'region' (country, region, site) or 'type' (type, country, site)"""
+    from .gazetteer import get_gazetteer
+
+    hierarchy = get_gazetteer().hierarchy()
+    if grouping == 'region':
+        paths = hierarchy
+    elif grouping == 'type':
+        paths = [(site_type(name), country, name) for country, _, name in hierarchy]
+    else:
+        raise ValueError(f"Unknown grouping: {grouping}")
+    return build_rollups(paths, start_year)
@@ -0,0 +1,319 @@
+import bisect
+import os
+import threading
+from collections import defaultdict
+from pathlib import Path
+from typing import Iterable, List, Sequence, Tuple
+
+import numpy as np
+import pyarrow as pa
+
+from .gazetteer import StringView, get_gazetteer, search_index_path
+from .seeding import normalize_location
+
+# Match classes, lower ranks first
+EXACT, NAME_PREFIX, WORD_PREFIX, SUBSTRING, FUZZY = range(5)
+MAX_POSTING_SCAN = 20000  # Skip very common trigrams when scoring typos unless nothing else is left
+INTERSECT_LIMIT = 20000  # Candidate sets up to this size are narrowed by intersecting posting lists
+VERIFY_LIMIT = 4096  # Verified candidates before a large set is narrowed further
+
+_index = None
+_index_lock = threading.Lock()
+
+
+class _SortedView:
+    """Sequence of keys in sorted order for bisect, without materializing the sorted list"""
+
+    def __init__(self, keys: Sequence[str], order: np.ndarray):
+        self._keys = keys
+        self._order = order
+
+    def __len__(self):
+        return len(self._order)
+
+    def __getitem__(self, position: int) -> str:
+        return self._keys[int(self._order[position])]
+
+
+def _trigrams(text: str) -> set:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _intersect(candidates: np.ndarray, sorted_ids: np.ndarray) -> np.ndarray:
+    """Keep the candidates present in a sorted posting list"""
+    if not len(sorted_ids):
+        return sorted_ids
+    positions = np.minimum(np.searchsorted(sorted_ids, candidates), len(sorted_ids) - 1)
+    return candidates[sorted_ids[positions] == candidates]
+
+
+def _prefix_edit_distance(query: str, key: str, max_distance: int) -> int:
+    """Levenshtein distance from the query to the closest prefix of key
+
+    Partially typed names therefore still match. Gives up with max_distance + 1
+    once every alignment exceeds the budget.
+    """
+    key = key[:len(query) + max_distance]
+    previous = list(range(len(key) + 1))
+    for i, char_q in enumerate(query, 1):
+        current = [i]
+        for j, char_k in enumerate(key, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_q != char_k)))
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous = current
+    return min(previous)
+
+
+def _index_arrays(keys: Sequence[str]) -> dict:
+    """Build the sorted order and trigram postings of normalized keys as flat arrays"""
+    order = np.array(sorted(range(len(keys)), key=keys.__getitem__), dtype=np.int32)
+    rank = np.empty(len(keys), dtype=np.int32)
+    rank[order] = np.arange(len(keys), dtype=np.int32)
+
+    # Trigram postings over the space padded name, so " ab" marks a word start
+    postings = defaultdict(list)
+    gram_counts = np.empty(len(keys), dtype=np.int32)
+    for i, key in enumerate(keys):
+        grams = _trigrams(f' {key} ')
+        gram_counts[i] = len(grams)
+        for gram in grams:
+            postings[gram].append(i)
+    grams = sorted(postings)
+    sizes = np.fromiter((len(postings[gram]) for gram in grams), dtype=np.int64, count=len(grams))
+    ids = np.fromiter((i for gram in grams for i in postings[gram]), dtype=np.int32, count=int(sizes.sum()))
+    return {
+        'order': order,
+        'rank': rank,
+        'lengths': np.fromiter((len(key) for key in keys), dtype=np.int32, count=len(keys)),
+        'gram_counts': gram_counts,
+        'grams': grams,
+        'gram_offsets': np.concatenate([[0], np.cumsum(sizes)]),
+        'posting_ids': ids
+    }
+
+
+def write_location_index(keys: Sequence[str], path) -> int:
+    """Build the index over normalized keys and write it as a memory-mappable Arrow file
+
+    Ids are positions in keys, so the file belongs to the gazetteer it was built
+    from. Returns the number of trigrams.
+    """
+    arrays = _index_arrays(keys)
+    # One row of list columns, so arrays of different lengths share a file
+    postings = pa.LargeListArray.from_arrays(pa.array(arrays['gram_offsets'], type=pa.int64()),
+                                             arrays['posting_ids'])
+    table = pa.table({
+        'order': [arrays['order']],
+        'rank': [arrays['rank']],
+        'lengths': [arrays['lengths']],
+        'gram_counts': [arrays['gram_counts']],
+        'grams': pa.array([arrays['grams']], type=pa.list_(pa.string())),
+        'postings': pa.ListArray.from_arrays([0, len(postings)], postings)
+    })
+
+    path = Path(path)
+    tmp_path = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+    with pa.OSFile(str(tmp_path), 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, path)
+    return len(arrays['grams'])
+
+
+class LocationIndex:
+    """Prefix and trigram index over location names with typo-tolerant, ranked lookups
+
+    Names are kept in their original form for display; matching uses the
+    normalized (lower case, single spaced) form. The index is a handful of flat
+    arrays, built in memory from names or mapped from a file written by
+    write_location_index.
+    """
+
+    def __init__(self, names: Iterable[str]):
+        names = list(names)
+        keys = [normalize_location(name) for name in names]
+        arrays = _index_arrays(keys)
+        self._attach(names, keys, arrays)
+        # Small enough to keep the sorted keys themselves
+        self._sorted_keys = [keys[i] for i in arrays['order'].tolist()]
+
+    @classmethod
+    def open(cls, path, names: Sequence[str], keys: Sequence[str]) -> 'LocationIndex':
+        """Map an index file over the names and normalized keys it was built from
+
+        Only the pages queries touch are read, so opening costs the same for
+        any number of names.
+        """
+        table = pa.ipc.open_file(pa.memory_map(str(path), 'r')).read_all()
+        if table.num_rows != 1 or len(table.column('order').chunk(0).values) != len(keys):
+            raise ValueError(f"{path} does not index these {len(keys):,} names")
+
+        def values(column: str):
+            return table.column(column).chunk(0).values
+
+        postings = values('postings')
+        arrays = {column: values(column).to_numpy(zero_copy_only=True)
+                  for column in ('order', 'rank', 'lengths', 'gram_counts')}
+        arrays['grams'] = StringView(values('grams'))
+        arrays['gram_offsets'] = postings.offsets.to_numpy(zero_copy_only=True)
+        arrays['posting_ids'] = postings.values.to_numpy(zero_copy_only=True)
+
+        index = cls.__new__(cls)
+        index._attach(names, keys, arrays)
+        index._sorted_keys = _SortedView(keys, arrays['order'])
+        return index
+
+    def _attach(self, names: Sequence[str], keys: Sequence[str], arrays: dict):
+        self.names = names
+        self.keys = keys
+        self.lengths = arrays['lengths']
+        self._sorted_ids = arrays['order']
+        self._rank = arrays['rank']
+        self._gram_counts = arrays['gram_counts']
+        self._grams = arrays['grams']
+        self._gram_offsets = arrays['gram_offsets']
+        self._posting_ids = arrays['posting_ids']
+
+    def __len__(self):
+        return len(self.names)
+
+    def _posting(self, gram: str) -> np.ndarray:
+        position = bisect.bisect_left(self._grams, gram)
+        if position == len(self._grams) or self._grams[position] != gram:
+            return self._posting_ids[:0]
+        return self._posting_ids[self._gram_offsets[position]:self._gram_offsets[position + 1]]
+
+    def _prefix_ids(self, query: str) -> np.ndarray:
+        lo = bisect.bisect_left(self._sorted_keys, query)
+        hi = bisect.bisect_left(self._sorted_keys, query + '\uffff')
+        return self._sorted_ids[lo:hi]
+
+    def _substring_lists(self, query: str) -> List[np.ndarray]:
+        """Posting lists whose intersection holds every name containing the query, rarest first"""
+        if len(query) < 3:
+            # Too short for inner trigrams, match word starts instead
+            return [self._posting(f' {query}') if len(query) == 2 else np.sort(self._prefix_ids(query))]
+        return sorted((self._posting(gram) for gram in _trigrams(query)), key=len)
+
+    def _match_class(self, key: str, query: str) -> int:
+        if key == query:
+            return EXACT
+        if key.startswith(query):
+            return NAME_PREFIX
+        if f' {query}' in f' {key}':
+            return WORD_PREFIX
+        if query in key:
+            return SUBSTRING
+        return FUZZY
+
+    def _ordered(self, ids: np.ndarray, limit: int) -> np.ndarray:
+        """Shortest names first, then alphabetical, using a partial sort for large candidate sets"""
+        order_key = (self.lengths[ids].astype(np.int64) << 32) | self._rank[ids]
+        if len(ids) > limit:
+            top = np.argpartition(order_key, limit - 1)[:limit]
+            ids, order_key = ids[top], order_key[top]
+        return ids[np.argsort(order_key)]
+
+    def search(self, query: str, limit: int = 10, fuzzy: bool = True) -> List[Tuple[str, int]]:
+        """Return up to limit (name, match class) pairs, best matches first"""
+        query = normalize_location(query)
+        if not query or limit <= 0:
+            return []
+
+        results = {}
+        exact_or_prefix = self._ordered(self._prefix_ids(query), limit)
+        for i in exact_or_prefix.tolist():
+            results[i] = self._match_class(self.keys[i], query)
+
+        if len(results) < limit:
+            self._add_substring_matches(query, limit, results)
+
+        if fuzzy and not results and len(query) >= 3:
+            # Nothing contains the query, so it is most likely misspelt
+            results = {i: FUZZY for i in self._fuzzy_ids(query, limit)[:limit]}
+            return [(self.names[i], FUZZY) for i in results]
+
+        ranked = sorted(results, key=lambda i: (results[i], self.lengths[i], self._rank[i]))[:limit]
+        return [(self.names[i], results[i]) for i in ranked]
+
+    def _add_substring_matches(self, query: str, limit: int, results: dict):
+        """Verify trigram candidates in ranked order until limit names contain the query"""
+        lists = self._substring_lists(query)
+        candidates, remaining = lists[0], lists[1:]
+
+        # Intersecting is cheap while the candidate set is small, large sets are verified lazily
+        while remaining and len(candidates) <= INTERSECT_LIMIT:
+            candidates = _intersect(candidates, remaining.pop(0))
+
+        checked = 0
+        step = max(limit * 4, 64)
+        while len(candidates):
+            ordered = self._ordered(candidates, min(len(candidates), step))
+            for i in ordered[checked:].tolist():
+                if i not in results:
+                    match = self._match_class(self.keys[i], query)
+                    if match != FUZZY:
+                        results[i] = match
+            checked = len(ordered)
+            if len(results) >= limit or checked >= len(candidates):
+                break
+            if checked >= VERIFY_LIMIT and remaining:
+                # Poor yield, narrow the candidates before verifying more
+                candidates = _intersect(candidates, remaining.pop(0))
+                checked = 0
+            step *= 4
+
+    def _fuzzy_ids(self, query: str, limit: int) -> List[int]:
+        """Rank names sharing trigrams with the query by Dice similarity, then edit distance"""
+        grams = _trigrams(f' {query} ')
+        lists = sorted((self._posting(gram) for gram in grams), key=len)
+        lists = [ids for ids in lists if len(ids)]
+        if not lists:
+            return []
+        selective = [ids for ids in lists if len(ids) <= MAX_POSTING_SCAN] or lists[:1]
+
+        # Score every posting occurrence, duplicates of a name share its score
+        occurrences = np.concatenate(selective)
+        counts = np.bincount(occurrences, minlength=len(self.names))
+        dice = 2 * counts[occurrences] / (len(grams) + self._gram_counts[occurrences])
+        keep = min(len(occurrences), limit * 3 * len(selective))
+        best = np.argpartition(-dice, keep - 1)[:keep]
+        ids, first = np.unique(occurrences[best], return_index=True)
+        top = ids[np.argsort(-dice[best][first], kind='stable')][:limit * 3]
+
+        max_distance = max(1, len(query) // 4)
+        scored = []
+        for i in top.tolist():
+            distance = _prefix_edit_distance(query, self.keys[i], max_distance)
+            if distance <= max_distance:
+                scored.append((distance, self.lengths[i], i))
+        return [i for _, _, i in sorted(scored)]
+
+
+def get_location_index() -> LocationIndex:
+    """Return the process-wide index over the gazetteer, mapping its index file on first use
+
+    build_gazetteer writes the index file. Gazetteers built without one get it
+    written on first use, or an in-memory index where their directory is read-only.
+    """
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                gazetteer = get_gazetteer()
+                path = search_index_path(gazetteer.path)
+                try:
+                    if not path.exists() or path.stat().st_mtime < gazetteer.path.stat().st_mtime:
+                        write_location_index(gazetteer.strings('key'), path)
+                    _index = LocationIndex.open(path, gazetteer.strings('name'), gazetteer.strings('key'))
+                except (OSError, ValueError):
+                    _index = LocationIndex(gazetteer.names())
+    return _index
+
+
+def reset_location_index():
+    """Drop the shared index so the next lookup rebuilds it"""
+    global _index
+    with _index_lock:
+        _index = None
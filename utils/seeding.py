@@ -0,0 +1,31 @@
+import hashlib
+
+import numpy as np
+
+
+def normalize_location(location: str) -> str:
+    """Return the canonical form of a location name used for seeding and cache keys"""
+    return ' '.join(location.lower().split())
+
+
+def stable_seed(*parts) -> int:
+    """Return a 64-bit seed that is identical in every process for the same parts
+
+    Unlike hash(), the digest is not salted per interpreter, so Streamlit workers
+    and restarts agree on the numbers generated for a location.
+    """
+    text = '\x1f'.join(str(part) for part in parts)
+    return int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def location_seed(location: str, stream: str = 'series') -> int:
+    """Return the stable seed of one random stream for a location"""
+    return stable_seed(normalize_location(location), stream)
+
+
+def location_rng(location: str, stream: str = 'series') -> np.random.Generator:
+    """Return a fresh Generator for a location
+
+    Each call owns its Generator, so concurrent sessions never share RNG state.
+    """
+    return np.random.default_rng(location_seed(location, stream))
@@ -0,0 +1,127 @@
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from typing import Optional
+
+from .cache import memoize
+from .data_generator import DeforestationBatch, simulate_deforestation
+
+
+class ForestSeries:
+    """Deforestation series for one location answering year-range queries in O(1)
+
+    Prefix sums of the annual rate are built once, so range totals, means and
+    cumulative losses never rescan the series. Values are stored as float32
+    with the years implied by first_year, and the location and area are
+    scalars; a DataFrame is only built by to_frame at render time.
+    """
+
+    __slots__ = ('location', 'first_year', 'forest_cover', 'deforestation_rate', 'total_area', '_rate_prefix')
+
+    def __init__(self, location: str, years, forest_cover, deforestation_rate, total_area: float):
+        self.location = location
+        self.first_year = int(np.asarray(years)[0])
+        self.forest_cover = np.asarray(forest_cover, dtype=np.float32)
+        self.deforestation_rate = np.asarray(deforestation_rate, dtype=np.float32)
+        self.total_area = float(total_area)
+        # Accumulated in float64 so long ranges do not drift
+        self._rate_prefix = np.concatenate(([0.0], np.cumsum(self.deforestation_rate, dtype=np.float64)))
+
+    @property
+    def last_year(self) -> int:
+        return self.first_year + len(self.forest_cover) - 1
+
+    @property
+    def years(self) -> np.ndarray:
+        return np.arange(self.first_year, self.last_year + 1)
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the arrays of the series"""
+        return self.forest_cover.nbytes + self.deforestation_rate.nbytes + self._rate_prefix.nbytes
+
+    @classmethod
+    def from_batch(cls, batch: DeforestationBatch, row: int = 0) -> 'ForestSeries':
+        """Build a series from one row of a simulate_deforestation batch"""
+        return cls(
+            batch.locations[row],
+            batch.years,
+            batch.forest_cover[row],
+            batch.deforestation_rate[row],
+            batch.total_area[row]
+        )
+
+    @classmethod
+    def from_frame(cls, data: pd.DataFrame) -> 'ForestSeries':
+        """Build a series from generate_deforestation_data output"""
+        return cls(
+            data['location'].iloc[0],
+            data['year'].to_numpy(),
+            data['forest_cover_percentage'].to_numpy(),
+            data['deforestation_rate'].to_numpy(),
+            data['total_area'].iloc[0]
+        )
+
+    def __len__(self):
+        return len(self.forest_cover)
+
+    def _bounds(self, start_year: Optional[int], end_year: Optional[int]):
+        """Return clamped [start, end] row indices for a year range"""
+        last = len(self.forest_cover) - 1
+        start = 0 if start_year is None else int(start_year) - self.first_year
+        end = last if end_year is None else int(end_year) - self.first_year
+        start = min(max(start, 0), last)
+        end = min(max(end, start), last)
+        return start, end
+
+    def forest_cover_at(self, year: Optional[int] = None) -> float:
+        """Forest cover percentage in a year, the latest year by default"""
+        _, end = self._bounds(year, year)
+        return float(self.forest_cover[end])
+
+    def total_loss(self, start_year: Optional[int] = None, end_year: Optional[int] = None) -> float:
+        """Drop in forest cover percentage between the first and last year of the range"""
+        start, end = self._bounds(start_year, end_year)
+        return float(self.forest_cover[start] - self.forest_cover[end])
+
+    def total_rate(self, start_year: Optional[int] = None, end_year: Optional[int] = None) -> float:
+        """Sum of annual deforestation rates over the range"""
+        start, end = self._bounds(start_year, end_year)
+        return float(self._rate_prefix[end + 1] - self._rate_prefix[start])
+
+    def mean_rate(self, start_year: Optional[int] = None, end_year: Optional[int] = None) -> float:
+        """Mean annual deforestation rate over the range"""
+        start, end = self._bounds(start_year, end_year)
+        return float((self._rate_prefix[end + 1] - self._rate_prefix[start]) / (end - start + 1))
+
+    def cumulative_loss(self, start_year: Optional[int] = None, end_year: Optional[int] = None) -> np.ndarray:
+        """Running total of the annual rate from the start of the range, one value per year"""
+        start, end = self._bounds(start_year, end_year)
+        return self._rate_prefix[start + 1:end + 2] - self._rate_prefix[start]
+
+    def to_frame(self, start_year: Optional[int] = None, end_year: Optional[int] = None) -> pd.DataFrame:
+        """Return the year range in the generate_deforestation_data layout
+
+        Values carry the float32 precision of the series, which is enough to
+        render. Downloads are built from the generator frame, see export_bytes.
+        """
+        start, end = self._bounds(start_year, end_year)
+        count = end - start + 1
+        return pd.DataFrame({
+            'year': np.arange(self.first_year + start, self.first_year + end + 1),
+            'forest_cover_percentage': self.forest_cover[start:end + 1].astype(float),
+            'deforestation_rate': self.deforestation_rate[start:end + 1].astype(float),
+            'total_area': np.full(count, self.total_area),
+            'location': [self.location] * count
+        })
+
+
+@memoize('forest_series', max_entries=256, disk=False, extra_key=lambda: datetime.now().year,
+         locations=('location',))
+def get_forest_series(location: str) -> ForestSeries:
+    """
+    Return the full series for a location, materialized once and shared by every rerun
+
+    Simulated directly, so no DataFrame of the series stays in memory.
+    """
+    return ForestSeries.from_batch(simulate_deforestation([location]))
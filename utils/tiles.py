@@ -0,0 +1,208 @@
+import asyncio
+import errno
+import functools
+import ipaddress
+import math
+import os
+import threading
+import urllib.request
+from typing import Optional
+from urllib.parse import urlencode
+
+import numpy as np
+import tornado.web
+
+from .cache import DEFAULT_CACHE_DIR, DiskLRUCache
+from .data_generator import get_location_coordinates
+from .density import DEFAULT_RADIUS, METERS_PER_DEGREE, cover_to_rgba, local_forest_cover, region_mask
+from .seeding import location_seed, normalize_location
+
+TILE_SIZE = 256
+MAX_TILE_ZOOM = 18  # Deepest zoom Leaflet requests for the density layer
+DEFAULT_TILE_PORT = int(os.environ.get('FOREST_TILE_PORT', 8502))
+# Loopback only unless explicitly exposed, rendering is unauthenticated and CPU bound
+DEFAULT_TILE_HOST = os.environ.get('FOREST_TILE_HOST', '127.0.0.1')
+SERVER_MARKER = b'forest-watch-tiles'
+TILE_CACHE_BYTES = int(os.environ.get('FOREST_TILE_CACHE_BYTES', 128 * 1024 * 1024))
+
+_tile_cache = None
+_cache_lock = threading.Lock()
+_server_url = None
+_server_lock = threading.Lock()
+
+
+def get_tile_cache() -> DiskLRUCache:
+    """Return the process-wide tile cache, creating it on first use"""
+    global _tile_cache
+    with _cache_lock:
+        if _tile_cache is None:
+            _tile_cache = DiskLRUCache(DEFAULT_CACHE_DIR / 'tiles', max_bytes=TILE_CACHE_BYTES)
+        return _tile_cache
+
+
+def tiles_available() -> bool:
+    """Whether browsers on other machines can load tiles
+
+    Tile URLs point at 127.0.0.1 unless FOREST_TILE_URL is set or the server
+    binds one specific non-loopback address. Behind HTTPS, FOREST_TILE_URL
+    must be an https URL too or browsers block the tiles as mixed content.
+    """
+    if os.environ.get('FOREST_TILE_URL'):
+        return True
+    try:
+        address = ipaddress.ip_address(DEFAULT_TILE_HOST)
+    except ValueError:
+        return DEFAULT_TILE_HOST not in ('', 'localhost')
+    # A wildcard bind is still advertised as 127.0.0.1
+    return not (address.is_loopback or address.is_unspecified)
+
+
+def _write_png(rgba: np.ndarray) -> bytes:
+    # Imported on first render, folium is slow to import and main.py imports this module
+    from folium.utilities import write_png
+
+    return write_png(rgba)
+
+
+@functools.lru_cache(maxsize=None)
+def empty_tile() -> bytes:
+    """The transparent tile served outside the modelled region, one shared object"""
+    return _write_png(np.zeros((TILE_SIZE, TILE_SIZE, 4), dtype=np.uint8))
+
+
+def tile_pixel_coordinates(z: int, x: int, y: int, size: int = TILE_SIZE):
+    """Return 2D latitude and longitude arrays for the pixel centers of a web mercator tile"""
+    n = 2 ** z
+    steps = (np.arange(size) + 0.5) / size
+    lon = (x + steps) / n * 360 - 180
+    lat = np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * (y + steps) / n))))
+    return np.meshgrid(lat, lon, indexing='ij')
+
+
+def tile_intersects_region(coordinates, z: int, x: int, y: int, radius: float = DEFAULT_RADIUS) -> bool:
+    """Check whether a tile overlaps the square modelled around a location"""
+    lat, lon = coordinates
+    n = 2 ** z
+    west, east = x / n * 360 - 180, (x + 1) / n * 360 - 180
+    north = np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * y / n))))
+    south = np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * (y + 1) / n))))
+    max_lat = radius / METERS_PER_DEGREE
+    max_lon = radius / (METERS_PER_DEGREE * np.cos(np.radians(lat)))
+    return south <= lat + max_lat and north >= lat - max_lat and west <= lon + max_lon and east >= lon - max_lon
+
+
+def render_tile(location: str, forest_cover: float, z: int, x: int, y: int) -> bytes:
+    """Render one 256x256 PNG tile of the forest density model"""
+    coordinates = get_location_coordinates(location)
+    if not tile_intersects_region(coordinates, z, x, y):
+        return empty_tile()
+
+    point_lat, point_lon = tile_pixel_coordinates(z, x, y)
+    rng = np.random.default_rng([location_seed(location, 'map'), z, x, y])
+    cover = local_forest_cover(location, coordinates, forest_cover, point_lat, point_lon, rng)
+    visible = region_mask(coordinates, point_lat, point_lon)
+    return _write_png(cover_to_rgba(point_lat, point_lon, cover, visible))
+
+
+def get_tile(location: str, forest_cover: float, z: int, x: int, y: int) -> bytes:
+    """Return a tile from the disk cache, rendering and storing it on a miss"""
+    key = (normalize_location(location), round(float(forest_cover), 1), z, x, y)
+    cache = get_tile_cache()
+    png = cache.get(key)
+    if png is None:
+        png = render_tile(location, key[1], z, x, y)
+        if png is not empty_tile():
+            cache.set(key, png)
+    return png
+
+
+class TileHandler(tornado.web.RequestHandler):
+    """Serve /tiles/{z}/{x}/{y}.png?location=...&forest_cover=..."""
+
+    async def get(self, z, x, y):
+        location = self.get_argument('location')
+        try:
+            forest_cover = float(self.get_argument('forest_cover'))
+        except ValueError:
+            raise tornado.web.HTTPError(400, 'forest_cover must be a number')
+        if not math.isfinite(forest_cover) or not 0 <= forest_cover <= 100:
+            raise tornado.web.HTTPError(400, 'forest_cover must be between 0 and 100')
+        z, x, y = int(z), int(x), int(y)
+        if z > MAX_TILE_ZOOM or x >= 2 ** z or y >= 2 ** z:
+            raise tornado.web.HTTPError(404, 'No such tile')
+
+        loop = asyncio.get_running_loop()
+        png = await loop.run_in_executor(None, get_tile, location, forest_cover, z, x, y)
+        self.set_header('Content-Type', 'image/png')
+        self.set_header('Cache-Control', 'public, max-age=86400')
+        self.set_header('Access-Control-Allow-Origin', '*')
+        self.write(png)
+
+
+class HealthHandler(tornado.web.RequestHandler):
+    """Identify the server, so another process can tell it apart from whatever else holds the port"""
+
+    def get(self):
+        self.write(SERVER_MARKER)
+
+
+def make_tile_app() -> tornado.web.Application:
+    """Create the tornado application serving density tiles"""
+    return tornado.web.Application([
+        (r'/tiles/(\d{1,2})/(\d+)/(\d+)\.png', TileHandler),
+        (r'/health', HealthHandler),
+    ])
+
+
+def _is_tile_server(url: str) -> bool:
+    try:
+        with urllib.request.urlopen(f'{url}/health', timeout=2) as response:
+            return response.read() == SERVER_MARKER
+    except OSError:
+        return False
+
+
+def _serve(host: str, port: int, ready: threading.Event, errors: list):
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        make_tile_app().listen(port, address=host)
+    except OSError as e:
+        errors.append(e)
+        ready.set()
+        return
+    ready.set()
+    loop.run_forever()
+
+
+def ensure_tile_server(port: Optional[int] = None, host: Optional[str] = None) -> str:
+    """Start the tile server in a background thread once per process and return its base URL
+
+    The server listens on 127.0.0.1 unless FOREST_TILE_HOST (or host) says
+    otherwise. Set FOREST_TILE_URL when browsers reach the server through a
+    different address.
+    """
+    global _server_url
+    with _server_lock:
+        if _server_url is None:
+            port = port or DEFAULT_TILE_PORT
+            host = host or DEFAULT_TILE_HOST
+            local_url = f'http://{"127.0.0.1" if host in ("0.0.0.0", "") else host}:{port}'
+            ready = threading.Event()
+            errors = []
+            threading.Thread(
+                target=_serve, args=(host, port, ready, errors), daemon=True, name='forest-tile-server'
+            ).start()
+            ready.wait(timeout=5)
+            if errors:
+                # Another worker process on this host may already be serving the same tiles
+                if errors[0].errno != errno.EADDRINUSE or not _is_tile_server(local_url):
+                    raise RuntimeError(f"Could not start tile server on {host}:{port}: {errors[0]}")
+            _server_url = os.environ.get('FOREST_TILE_URL', local_url)
+        return _server_url
+
+
+def tile_url_template(base_url: str, location: str, forest_cover: float) -> str:
+    """Return the Leaflet URL template for a location's density tiles"""
+    query = urlencode({'location': location, 'forest_cover': round(float(forest_cover), 1)})
+    return f'{base_url}/tiles/{{z}}/{{x}}/{{y}}.png?{query}'
@@ -1,14 +1,93 @@
 import plotly.graph_objects as go
-import plotly.express as px
-import folium
-from folium import plugins
-import streamlit as st
-from typing import Tuple
-import branca.colormap as cm
+from datetime import datetime
+from typing import Optional, Tuple
 import numpy as np
 
-def create_trend_chart(data, title: str) -> go.Figure:
-    """Create an interactive trend chart using Plotly"""
+from .density import (
+    DEFAULT_NUM_POINTS,
+    compute_density_field,
+    sample_forest_clusters
+)
+from .cache import memoize
+from .raster import RASTER_NUM_POINTS, build_forest_raster
+from .seeding import location_seed
+
+RENDER_MODES = ('markers', 'raster', 'tiles')
+WEBGL_MIN_LOCATIONS = 20  # More locations than this are packed into one WebGL trace
+MAX_CHART_POINTS = 20000  # Points per comparison chart before series are downsampled
+COMPARISON_COLORS = [
+    '#2E7D32', '#1565C0', '#EF6C00', '#6A1B9A', '#C62828', '#00838F', '#9E9D24', '#4E342E', '#AD1457', '#37474F'
+]
+
+
+def is_multi_location(data) -> bool:
+    """True when long-format data holds more than one location"""
+    return 'location' in data and data['location'].nunique() > 1
+
+
+def location_matrix(data, column: str):
+    """Pivot long-format data into (locations, years, values) with locations in order of appearance"""
+    locations = data['location'].unique()
+    matrix = data.pivot(index='location', columns='year', values=column).reindex(locations)
+    return list(locations), matrix.columns.to_numpy(), matrix.to_numpy(dtype=float)
+
+
+def downsample_columns(years: np.ndarray, values: np.ndarray, max_points: int):
+    """Keep evenly spaced years, including the first and last, so values holds at most max_points points"""
+    per_series = max(2, max_points // max(len(values), 1))
+    if len(years) <= per_series:
+        return years, values
+    keep = np.unique(np.linspace(0, len(years) - 1, per_series).round().astype(int))
+    return years[keep], values[:, keep]
+
+
+def location_traces(locations, years, values, hovertemplate: str, **line):
+    """Draw one line per location, packing many locations into a single Scattergl trace
+
+    A few locations get their own named, colored traces. Beyond
+    WEBGL_MIN_LOCATIONS the lines are concatenated with gaps into one WebGL trace,
+    which keeps figure building and browser rendering flat in the number of
+    locations. Values are rounded to two decimals to keep the JSON small.
+    """
+    years, values = downsample_columns(years, np.round(values, 2), MAX_CHART_POINTS)
+    if len(locations) <= WEBGL_MIN_LOCATIONS:
+        return [
+            go.Scatter(
+                x=years,
+                y=row,
+                name=location,
+                line=dict(color=COMPARISON_COLORS[i % len(COMPARISON_COLORS)], width=2),
+                hovertemplate=f'<b>{location}</b><br>{hovertemplate}<extra></extra>'
+            )
+            for i, (location, row) in enumerate(zip(locations, values))
+        ]
+
+    # A NaN after every series breaks the line between locations, float32 halves the encoded arrays
+    n_locations, n_years = values.shape
+    x = np.tile(np.append(years, np.nan).astype(np.float32), n_locations)
+    y = np.hstack([values, np.full((n_locations, 1), np.nan)]).astype(np.float32).ravel()
+    text = np.repeat(np.asarray(locations, dtype=object), n_years + 1)
+    return [go.Scattergl(
+        x=x,
+        y=y,
+        text=text,
+        mode='lines',
+        name=f'{n_locations} locations',
+        line=dict(width=1, **line),
+        opacity=0.5,
+        hovertemplate=f'<b>%{{text}}</b><br>{hovertemplate}<extra></extra>'
+    )]
+
+def create_trend_chart(data, title: str, forecast=None) -> go.Figure:
+    """Create an interactive trend chart using Plotly
+
+    forecast is an optional ForestForecast drawn as a shaded p5-p95 band
+    around its median after the historical series. Long-format data with
+    several locations draws one line per location instead.
+    """
+    if is_multi_location(data):
+        return _create_comparison_trend_chart(data, title)
+
     fig = go.Figure()
 
     # Add forest cover trend
@@ -22,6 +101,33 @@ def create_trend_chart(data, title: str) -> go.Figure:
         hovertemplate='Year: %{x}<br>Forest Cover: %{y:.1f}%<extra></extra>'
     ))
 
+    if forecast is not None:
+        # Upper bound first so the lower bound can fill up to it
+        fig.add_trace(go.Scatter(
+            x=forecast.years,
+            y=forecast.p95,
+            name='Forecast p95',
+            line=dict(width=0),
+            showlegend=False,
+            hovertemplate='p95: %{y:.1f}%<extra></extra>'
+        ))
+        fig.add_trace(go.Scatter(
+            x=forecast.years,
+            y=forecast.p5,
+            name='Forecast 5-95% range',
+            line=dict(width=0),
+            fill='tonexty',
+            fillcolor='rgba(255, 160, 0, 0.25)',
+            hovertemplate='p5: %{y:.1f}%<extra></extra>'
+        ))
+        fig.add_trace(go.Scatter(
+            x=forecast.years,
+            y=forecast.p50,
+            name='Forecast median',
+            line=dict(color='#EF6C00', width=2, dash='dash'),
+            hovertemplate='Median: %{y:.1f}%<extra></extra>'
+        ))
+
     fig.update_layout(
         title=dict(
             text=title,
@@ -37,8 +143,48 @@ def create_trend_chart(data, title: str) -> go.Figure:
 
     return fig
 
-def create_map(location: str, coordinates: Tuple[float, float], forest_cover: float) -> folium.Map:
-    """Create an enhanced Folium map with forest cover visualization"""
+def create_map(location: str, coordinates: Tuple[float, float], forest_cover: float,
+               num_points: Optional[int] = None, seed: Optional[int] = None,
+               render_mode: str = 'markers', tile_url: Optional[str] = None) -> str:
+    """Create an enhanced Folium map with forest cover visualization
+
+    num_points sets the density grid resolution (2 * num_points + 1 points per side)
+    and seed overrides the location's stable seed for the sampled forest clusters.
+    render_mode 'markers' draws individual forest clusters while 'raster' draws the
+    whole density field as a single image overlay, which keeps the HTML small. 'tiles' streams the
+    density as map tiles from the local tile server (tile_url, started on demand)
+    so the browser only fetches what is visible at the current zoom.
+    """
+    return _build_map_html(*map_build_args(location, coordinates, forest_cover, num_points, seed,
+                                           render_mode, tile_url))
+
+
+def map_build_args(location: str, coordinates: Tuple[float, float], forest_cover: float,
+                   num_points: Optional[int] = None, seed: Optional[int] = None,
+                   render_mode: str = 'markers', tile_url: Optional[str] = None) -> tuple:
+    """Resolve create_map's arguments to the ones the built HTML is cached by"""
+    if render_mode not in RENDER_MODES:
+        raise ValueError(f"Unknown render mode: {render_mode}")
+    if num_points is None:
+        num_points = RASTER_NUM_POINTS if render_mode == 'raster' else DEFAULT_NUM_POINTS
+    if render_mode == 'tiles' and tile_url is None:
+        from .tiles import ensure_tile_server
+
+        tile_url = ensure_tile_server()
+
+    coordinates = (float(coordinates[0]), float(coordinates[1]))
+    return location, coordinates, float(forest_cover), num_points, seed, render_mode, tile_url
+
+
+@memoize('maps', max_entries=32, disk_bytes=512 * 1024 * 1024)
+def _build_map_html(location: str, coordinates: Tuple[float, float], forest_cover: float,
+                    num_points: int, seed: Optional[int], render_mode: str, tile_url: Optional[str]) -> str:
+    """Build the map HTML, cached per location and rendering parameters"""
+    # folium and branca are only needed on a cache miss, keep them off the import path
+    import branca.colormap as cm
+    import folium
+    from folium import plugins
+
     lat, lon = coordinates
 
     # Create base map with satellite imagery
@@ -53,101 +199,45 @@ def create_map(location: str, coordinates: Tuple[float, float], forest_cover: fl
     # Add CartoDB positron as an optional layer
     folium.TileLayer('CartoDB positron', name='Light Map').add_to(m)
 
-    # Create forest density visualization
-    radius = 20000  # 20km radius
-    num_points = 20
-    grid_size = radius / num_points
-
-    # Generate grid of points for density visualization
-    for i in range(-num_points, num_points + 1):
-        for j in range(-num_points, num_points + 1):
-            point_lat = lat + (i * grid_size / 111111)  # Convert meters to degrees
-            point_lon = lon + (j * grid_size / (111111 * np.cos(np.radians(lat))))
-
-            # Skip points in the sea (basic land check based on distance from coast)
-            distance_from_coast = abs(point_lon - lon)  # Simple distance from coastline
-            if distance_from_coast > 0.1:  # Skip if too far into sea
-                continue
-
-            # Calculate distance from center with reduced radius
-            distance = np.sqrt((lat - point_lat)**2 + (lon - point_lon)**2)
-            max_distance = grid_size * (num_points/2) / 111111  # Reduced radius
-
-            # Enhanced local forest cover calculation with urban-aware patterns
-            distance_factor = 1 - (distance / max_distance)**1.5  # Smoother falloff
-            elevation = np.sin(point_lat * 15) * np.cos(point_lon * 15) * 0.3  # Gentler elevation
-            moisture = np.cos(point_lat * 10 - point_lon * 10) * 0.2  # Urban moisture patterns
-
-            # Urban-aware terrain influence
-            terrain_factor = (
-                np.sin(point_lat * 15 + point_lon * 15) * 0.2 +  # Urban features
-                np.cos(point_lat * 25 - point_lon * 25) * 0.15 +  # Parks and green spaces
-                np.sin((point_lat * 35 + point_lon * 35)) * 0.1  # Small urban forests
-            )
-
-            # Combine environmental factors with higher base values for rainforests
-            environmental_factor = 1.5 + elevation + moisture + terrain_factor
-            random_variation = np.random.normal(1, 0.1)  # Subtle natural variation
-
-            # Enhanced forest density for rainforest areas
-            if "rainforest" in location.lower():
-                base_density = 0.8  # Higher base density for rainforests
-            else:
-                base_density = 0.6
-
-            # Gradual falloff from center with higher minimum
-            local_cover = forest_cover * max(base_density, distance_factor) * random_variation * environmental_factor
-
-            # Add subtle noise based on position
-            noise = np.sin(point_lat * 25) * np.cos(point_lon * 25) * 0.1
-            local_cover *= (1 + noise)
-            local_cover = max(0, min(100, local_cover))  # Clamp values
-
-            if local_cover > 2:  # Lower threshold for urban areas
-                # Create organic shapes with varied patterns
-                pattern_scale = 60
-                noise_val = (np.sin(point_lat * pattern_scale) * np.cos(point_lon * pattern_scale) + 
-                           np.sin((point_lat + point_lon) * pattern_scale * 0.5)) * 0.5
-
-                # More natural color gradients
-                base_green = int(70 + (local_cover/100) * 120)
-                color = f'#{int(30 + noise_val * 20):02x}{base_green:02x}{int(30):02x}'
-
-                # Varied cluster sizes
-                base_radius = 6 + (noise_val + 1) * 4
-                cluster_size = np.random.randint(3, 6)
-
-                # Create organic forest clusters with natural distribution
-                for _ in range(cluster_size):
-                    # Use polar coordinates for more natural spread
-                    angle = np.random.uniform(0, 2 * np.pi)
-                    distance = np.random.exponential(0.0002)
-
-                    # Convert to lat/lon offsets
-                    offset_lat = distance * np.cos(angle)
-                    offset_lon = distance * np.sin(angle)
-
-                    # Add some terrain-based variation
-                    terrain_influence = np.sin(point_lat * 30 + point_lon * 30) * 0.00005
-                    offset_lat += terrain_influence
-                    offset_lon += terrain_influence
-
-                    # Vary marker size based on position and terrain
-                    size_variation = (1 + np.sin(point_lat * 20 + point_lon * 20) * 0.3)
-                    radius_var = base_radius * size_variation * (0.7 + np.random.beta(2, 2) * 0.6)
-
-                    # Natural opacity variation
-                    opacity = min(local_cover/100 * 0.65 * (0.5 + np.random.beta(2, 2) * 0.5), 0.75)
-
-                    folium.CircleMarker(
-                        location=[point_lat + offset_lat, point_lon + offset_lon],
-                        radius=radius_var,
-                        color=color,
-                        fill=True,
-                        fill_opacity=opacity,
-                        weight=1,
-                        stroke=False
-                    ).add_to(m)
+    # Create forest density visualization as whole-array operations
+    rng = np.random.default_rng(seed if seed is not None else location_seed(location, 'map'))
+    if render_mode == 'tiles':
+        from .tiles import MAX_TILE_ZOOM, tile_url_template
+
+        folium.TileLayer(
+            tiles=tile_url_template(tile_url, location, forest_cover),
+            attr='Forest Watch',
+            name='Forest Density',
+            overlay=True,
+            max_zoom=MAX_TILE_ZOOM
+        ).add_to(m)
+    elif render_mode == 'raster':
+        # Shared with the zonal statistics of the Overview tab
+        raster = build_forest_raster(location, coordinates, forest_cover, num_points, seed)
+        folium.raster_layers.ImageOverlay(
+            image=raster.to_rgba(),
+            bounds=raster.bounds(),
+            origin='lower',
+            pixelated=False,
+            name='Forest Density'
+        ).add_to(m)
+    else:
+        field = compute_density_field(location, coordinates, forest_cover, num_points=num_points, rng=rng)
+        clusters = sample_forest_clusters(field, rng)
+
+        # Create organic forest clusters with natural distribution
+        for point_lat, point_lon, radius_var, opacity, color in zip(
+                clusters.lat.tolist(), clusters.lon.tolist(), clusters.radius.tolist(),
+                clusters.opacity.tolist(), clusters.color.tolist()):
+            folium.CircleMarker(
+                location=[point_lat, point_lon],
+                radius=radius_var,
+                color=color,
+                fill=True,
+                fill_opacity=opacity,
+                weight=1,
+                stroke=False
+            ).add_to(m)
 
     # Add central marker
     folium.CircleMarker(
@@ -186,12 +276,43 @@ def create_map(location: str, coordinates: Tuple[float, float], forest_cover: fl
 
     return map_html
 
-def create_deforestation_rate_chart(data) -> go.Figure:
-    """Create an enhanced bar chart showing deforestation rates"""
+def _create_comparison_trend_chart(data, title: str) -> go.Figure:
+    """Forest cover of many locations on one chart"""
+    locations, years, cover = location_matrix(data, 'forest_cover_percentage')
+    fig = go.Figure(location_traces(
+        locations, years, cover, 'Year: %{x}<br>Forest Cover: %{y:.1f}%', color='#2E7D32'
+    ))
+    fig.update_layout(
+        title=dict(
+            text=title,
+            font=dict(size=24)
+        ),
+        xaxis_title='Year',
+        yaxis_title='Forest Cover (%)',
+        template='simple_white',
+        hovermode='closest',
+        height=400,
+        margin=dict(l=20, r=20, t=40, b=20)
+    )
+    return fig
+
+
+def create_deforestation_rate_chart(data, cumulative_deforestation=None) -> go.Figure:
+    """Create an enhanced bar chart showing deforestation rates
+
+    Pass cumulative_deforestation (e.g. ForestSeries.cumulative_loss) to reuse
+    precomputed totals instead of summing the rates again. Long-format data with
+    several locations draws the mean annual rate as bars and each location's
+    cumulative loss as a line.
+    """
+    if is_multi_location(data):
+        return _create_comparison_rate_chart(data)
+
     fig = go.Figure()
 
     # Calculate cumulative deforestation
-    cumulative_deforestation = data['deforestation_rate'].cumsum()
+    if cumulative_deforestation is None:
+        cumulative_deforestation = data['deforestation_rate'].cumsum()
 
     # Add bar chart for annual rate
     fig.add_trace(go.Bar(
@@ -231,4 +352,78 @@ def create_deforestation_rate_chart(data) -> go.Figure:
         )
     )
 
-    return fig
\ No newline at end of file
+    return fig
+
+
+def _create_comparison_rate_chart(data) -> go.Figure:
+    """Mean annual rate and per-location cumulative loss of many locations on one chart"""
+    locations, years, rates = location_matrix(data, 'deforestation_rate')
+    fig = go.Figure()
+    fig.add_trace(go.Bar(
+        x=years,
+        y=np.round(rates.mean(axis=0), 2),
+        name='Mean Annual Rate',
+        marker_color='#C62828',
+        opacity=0.7,
+        hovertemplate='Year: %{x}<br>Mean Rate: %{y:.2f} ha/year<extra></extra>'
+    ))
+    fig.add_traces(location_traces(
+        locations, years, np.cumsum(rates, axis=1), 'Year: %{x}<br>Total Loss: %{y:.2f} ha', color='#FF5252'
+    ))
+    fig.update_layout(
+        title=dict(
+            text='Deforestation Analysis',
+            font=dict(size=24)
+        ),
+        xaxis_title='Year',
+        yaxis_title='Hectares',
+        template='simple_white',
+        hovermode='closest',
+        height=400,
+        margin=dict(l=20, r=20, t=40, b=20),
+        legend=dict(
+            orientation="h",
+            yanchor="bottom",
+            y=1.02,
+            xanchor="right",
+            x=1
+        )
+    )
+    return fig
+
+
+# Figures are shared by every session, st.plotly_chart only serializes them
+@memoize('trend_charts', max_entries=64, disk=False, extra_key=lambda: datetime.now().year)
+def location_trend_chart(location: str, start_year: int, forecast: bool = False) -> go.Figure:
+    """Trend chart of a location from start_year, with its forecast bands if asked"""
+    from .forecast import forecast_forest_cover
+    from .series import get_forest_series
+
+    return create_trend_chart(
+        get_forest_series(location).to_frame(start_year),
+        f'Forest Cover Trends in {location}',
+        forecast_forest_cover(location) if forecast else None
+    )
+
+
+@memoize('rate_charts', max_entries=64, disk=False, extra_key=lambda: datetime.now().year)
+def location_rate_chart(location: str, start_year: int) -> go.Figure:
+    """Deforestation rate chart of a location from start_year"""
+    from .series import get_forest_series
+
+    series = get_forest_series(location)
+    return create_deforestation_rate_chart(series.to_frame(start_year), series.cumulative_loss(start_year))
+
+
+@memoize('comparison_charts', max_entries=8, disk=False, extra_key=lambda: datetime.now().year)
+def comparison_charts(locations: Tuple[str, ...], start_year: int) -> Tuple[go.Figure, go.Figure]:
+    """Trend and rate charts overlaying locations from start_year"""
+    from .data_generator import generate_deforestation_data_many
+
+    # Sliced rather than generated from start_year, so the values match the single location charts
+    data = generate_deforestation_data_many(list(locations))
+    data = data[data['year'] >= start_year].reset_index(drop=True)
+    return (
+        create_trend_chart(data, f'Forest Cover of {len(locations)} Locations'),
+        create_deforestation_rate_chart(data)
+    )